@@ -1,14 +1,25 @@
 import time
 import requests
 import pandas as pd
+import numpy as np
 import json
 import curses
 import random
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+import argparse
+import bisect
+import http.server
 import logging
+import os
+import signal
+import queue
+import sqlite3
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 # Keep your existing logging configuration
 logging.basicConfig(
@@ -20,11 +31,598 @@ logging.basicConfig(
     ]
 )
 
+# DexScreener answers these with transient errors worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Maximum number of comma-separated addresses per DexScreener token lookup
+BULK_TOKEN_LIMIT = 30
+# Key stamped onto DexScreener responses and their pairs with the wall-clock time they were fetched,
+# so a response served again from the search cache is not mistaken for a new observation
+FETCHED_AT = 'fetchedAt'
+
+# Data files written by the monitor and the paper trader
+DATA_FILE = 'memecoin_data.db'
+LEGACY_DATA_FILE = 'memecoin_data.csv'
+JOURNAL_FILE = 'paper_trader.journal'
+SNAPSHOT_FILE = 'paper_trader.snapshot.json'
+ALERT_RULES_FILE = 'alert_rules.json'
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to stay under the API rate limit"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Wait for a token; returns False if it cannot be had before the deadline"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed time-to-live"""
+    def __init__(self, ttl: float = 30.0, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+class NullTimer:
+    """Context manager that records nothing; returned while metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+class Timer:
+    """Times a block and records it in a Metrics histogram"""
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: Tuple):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, self.labels, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms with Prometheus text export.
+
+    Every entry point returns immediately while disabled, so instrumented code
+    pays one attribute check per call (timers hand back a shared no-op).
+    """
+    # Histogram bucket upper bounds in seconds
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    PREFIX = 'memecoin_'
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        # (name, labels) -> [bucket counts incl. +Inf, sum, count, max]
+        self.histograms = {}
+        self.exporter = None
+        self.export_path = None
+        self.server = None
+        self.stop_event = threading.Event()
+
+    @staticmethod
+    def label_key(labels: Dict) -> Tuple:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, self.label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[(name, self.label_key(labels))] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        if self.enabled:
+            self.record(name, self.label_key(labels), seconds)
+
+    def timer(self, name: str, **labels):
+        """Context manager recording the block's duration in the named histogram"""
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, self.label_key(labels))
+
+    def record(self, name: str, labels: Tuple, seconds: float):
+        bucket = bisect.bisect_left(self.BUCKETS, seconds)
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = [[0] * (len(self.BUCKETS) + 1), 0.0, 0, 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+            if seconds > histogram[3]:
+                histogram[3] = seconds
+
+    def quantile(self, buckets: List[int], count: int, peak: float, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, capped at the largest one seen"""
+        rank = q * count
+        seen = 0
+        for bound, observed in zip(self.BUCKETS, buckets):
+            seen += observed
+            if seen >= rank:
+                return min(bound, peak)
+        return peak
+
+    def summary(self) -> Tuple[List[Dict], List[Dict]]:
+        """Histogram rows (slowest total first) and counter/gauge rows for the stats page"""
+        with self.lock:
+            histograms = [(key, list(value[0]), value[1], value[2], value[3]) for key, value in self.histograms.items()]
+            values = list(self.counters.items()) + list(self.gauges.items())
+        timings = []
+        for (name, labels), buckets, total, count, peak in sorted(histograms, key=lambda item: -item[2]):
+            timings.append({
+                'name': name, 'labels': ','.join(f"{key}={value}" for key, value in labels),
+                'count': count, 'total': total, 'mean': total / count if count else 0.0,
+                'p50': self.quantile(buckets, count, peak, 0.5), 'p95': self.quantile(buckets, count, peak, 0.95),
+                'max': peak
+            })
+        counts = [{'name': name, 'labels': ','.join(f"{key}={value}" for key, value in labels), 'value': value}
+                  for (name, labels), value in sorted(values)]
+        return timings, counts
+
+    @staticmethod
+    def format_labels(labels: Tuple, extra: Optional[Tuple] = None) -> str:
+        pairs = list(labels) + list(extra or ())
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted((key, list(value[0]), value[1], value[2]) for key, value in self.histograms.items())
+        lines = []
+        typed = set()
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in items:
+                metric = self.PREFIX + name
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric}{self.format_labels(labels)} {value}")
+        for (name, labels), buckets, total, count in histograms:
+            metric = self.PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, observed in zip(self.BUCKETS + ('+Inf',), buckets):
+                cumulative += observed
+                lines.append(f"{metric}_bucket{self.format_labels(labels, (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{metric}_sum{self.format_labels(labels)} {total}")
+            lines.append(f"{metric}_count{self.format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Atomically replace a textfile-collector style metrics file"""
+        tmp_path = Path(f"{path}.tmp")
+        tmp_path.write_text(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_exporter(self, path: Optional[str] = None, port: Optional[int] = None, interval: float = 15.0):
+        """Periodically write metrics to a file and/or serve them on localhost:<port>/metrics"""
+        if not self.enabled:
+            return
+        if port:
+            metrics = self
+
+            class MetricsHandler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip('/') not in ('', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = metrics.to_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = http.server.ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+            threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+            logging.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+        if path:
+            def export_loop():
+                while not self.stop_event.wait(interval):
+                    try:
+                        self.write(path)
+                    except Exception as e:
+                        logging.error(f"Error writing metrics to {path}: {e}")
+
+            self.exporter = threading.Thread(target=export_loop, name='metrics-file', daemon=True)
+            self.exporter.start()
+            self.export_path = path
+            logging.info(f"Writing metrics to {path} every {interval:.0f}s")
+
+    def stop_exporter(self):
+        self.stop_event.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.exporter:
+            self.exporter.join(timeout=5.0)
+            try:
+                self.write(self.export_path)
+            except Exception as e:
+                logging.error(f"Error writing metrics to {self.export_path}: {e}")
+
+# Process-wide instrumentation; enabled from the command line with --metrics
+METRICS = Metrics()
+
+class TimeSeriesStore:
+    """Per-token ring buffers of observed (timestamp, price, volume, liquidity) samples.
+
+    All samples live in one preallocated array that grows by doubling up to
+    max_tokens slots. Appends are O(1); tokens idle for longer than max_idle
+    seconds are evicted, and when every slot is busy the least recently seen
+    token makes room.
+    """
+    FIELDS = ('timestamp', 'price', 'volume', 'liquidity')
+
+    def __init__(self, capacity: int = 64, max_tokens: int = 20000, max_idle: float = 6 * 3600,
+                 min_interval: float = 5.0):
+        self.capacity = capacity
+        self.max_tokens = max_tokens
+        self.max_idle = max_idle
+        self.min_interval = min_interval
+        self.lock = threading.RLock()
+        # Called with the key of every evicted token so dependent state can be dropped
+        self.on_evict = None
+        self.slots = {}
+        self.keys = []
+        self.free_slots = []
+        self.allocate(min(256, max_tokens))
+
+    def allocate(self, size: int):
+        """Grow the backing arrays to hold `size` token slots"""
+        old_size = len(self.keys)
+        data = np.full((size, self.capacity, len(self.FIELDS)), np.nan)
+        heads = np.zeros(size, dtype=np.int64)
+        counts = np.zeros(size, dtype=np.int64)
+        last_seen = np.full(size, -np.inf)
+        if old_size:
+            data[:old_size] = self.data
+            heads[:old_size] = self.heads
+            counts[:old_size] = self.counts
+            last_seen[:old_size] = self.last_seen
+        self.data, self.heads, self.counts, self.last_seen = data, heads, counts, last_seen
+        self.keys.extend([None] * (size - old_size))
+        self.free_slots.extend(range(size - 1, old_size - 1, -1))
+
+    def slot_for(self, key: str, now: float) -> int:
+        slot = self.slots.get(key)
+        if slot is not None:
+            return slot
+        if not self.free_slots:
+            self.evict_idle(now)
+        if not self.free_slots:
+            if len(self.keys) < self.max_tokens:
+                self.allocate(min(len(self.keys) * 2, self.max_tokens))
+            else:
+                # Slots claimed earlier in this batch are marked as seen at +inf (see append_many) and survive
+                candidates = np.where(self.counts > 0, self.last_seen, np.inf)
+                slot = int(np.argmin(candidates))
+                if np.isinf(candidates[slot]):
+                    raise RuntimeError(f"All {self.max_tokens} history slots are claimed by the current batch")
+                self.release(slot)
+        slot = self.free_slots.pop()
+        self.slots[key] = slot
+        self.keys[slot] = key
+        return slot
+
+    def release(self, slot: int):
+        if self.on_evict:
+            self.on_evict(self.keys[slot])
+        del self.slots[self.keys[slot]]
+        self.keys[slot] = None
+        self.heads[slot] = 0
+        self.counts[slot] = 0
+        self.last_seen[slot] = -np.inf
+        self.data[slot] = np.nan
+        self.free_slots.append(slot)
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """Drop tokens that have not been observed within max_idle seconds"""
+        now = time.time() if now is None else now
+        with self.lock:
+            idle = np.flatnonzero((self.counts > 0) & (self.last_seen < now - self.max_idle))
+            evicted = [self.keys[slot] for slot in idle]
+            for slot in idle:
+                self.release(int(slot))
+            return evicted
+
+    def append(self, key: str, timestamp: float, price: float, volume: float, liquidity: float) -> bool:
+        """Record one sample; returns False if it is not newer than the last one or within min_interval of it"""
+        with self.lock:
+            slot = self.slot_for(key, timestamp)
+            if timestamp <= self.last_seen[slot] or timestamp - self.last_seen[slot] < self.min_interval:
+                return False
+            head = self.heads[slot]
+            self.data[slot, head] = (timestamp, price, volume, liquidity)
+            self.heads[slot] = (head + 1) % self.capacity
+            self.counts[slot] = min(self.counts[slot] + 1, self.capacity)
+            self.last_seen[slot] = timestamp
+            return True
+
+    def append_many(self, keys: List[str], timestamps, prices: np.ndarray,
+                    volumes: np.ndarray, liquidities: np.ndarray) -> np.ndarray:
+        """Record one sample per key (keys must be unique).
+
+        timestamps is one observation time for every key or an array with one
+        per key. Returns a mask of the keys that were recorded: samples no newer
+        than a key's last one (such as a cached response seen again) or within
+        min_interval of it are skipped. At most max_tokens keys of one batch are
+        recorded, since a batch cannot evict slots it has already claimed.
+        """
+        with self.lock:
+            recorded = np.zeros(len(keys), dtype=bool)
+            if len(keys) > self.max_tokens:
+                logging.warning(f"History store holds at most {self.max_tokens} tokens, "
+                                f"skipping {len(keys) - self.max_tokens} of this batch")
+                keys = keys[:self.max_tokens]
+            timestamps = np.broadcast_to(np.asarray(timestamps, dtype=float), recorded.shape)[:len(keys)]
+            slots = np.empty(len(keys), dtype=np.int64)
+            last_seen = np.empty(len(keys))
+            for i, (key, timestamp) in enumerate(zip(keys, timestamps.tolist())):
+                slot = slots[i] = self.slot_for(key, timestamp)
+                # Claimed slots look seen at +inf until the batch is written, so later keys cannot evict them
+                last_seen[i] = self.last_seen[slot]
+                self.last_seen[slot] = np.inf
+            fresh = (timestamps > last_seen) & (timestamps - last_seen >= self.min_interval)
+            self.last_seen[slots] = last_seen
+            recorded[:len(keys)] = fresh
+            slots = slots[fresh]
+            heads = self.heads[slots]
+            self.data[slots, heads] = np.column_stack([
+                timestamps[fresh],
+                np.asarray(prices, dtype=float)[:len(fresh)][fresh],
+                np.asarray(volumes, dtype=float)[:len(fresh)][fresh],
+                np.asarray(liquidities, dtype=float)[:len(fresh)][fresh]
+            ])
+            self.heads[slots] = (heads + 1) % self.capacity
+            self.counts[slots] = np.minimum(self.counts[slots] + 1, self.capacity)
+            self.last_seen[slots] = timestamps[fresh]
+            return recorded
+
+    def matrix(self, keys: List[str], field: str = 'volume') -> Tuple[np.ndarray, np.ndarray]:
+        """tokens x capacity matrix of one field, oldest first and right-aligned, plus validity mask"""
+        with self.lock:
+            slots = np.array([self.slots.get(key, -1) for key in keys], dtype=np.int64)
+            known = slots >= 0
+            safe_slots = np.where(known, slots, 0)
+            columns = np.arange(self.capacity)
+            order = (self.heads[safe_slots, None] - self.capacity + columns) % self.capacity
+            values = self.data[safe_slots[:, None], order, self.FIELDS.index(field)]
+            counts = np.where(known, self.counts[safe_slots], 0)
+        mask = columns >= self.capacity - counts[:, None]
+        return np.where(mask, values, np.nan), mask & ~np.isnan(values)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.slots
+
+class IndicatorState:
+    """Running state for one token's streaming indicators"""
+    __slots__ = ('ticks', 'last_price', 'ema_fast', 'ema_slow', 'macd_signal', 'avg_gain', 'avg_loss',
+                 'atr', 'obv', 'pv_sum', 'volume_sum', 'window', 'window_mean', 'window_m2')
+
+    def __init__(self, window: int):
+        self.ticks = 0
+        self.last_price = None
+        self.ema_fast = self.ema_slow = self.macd_signal = 0.0
+        self.avg_gain = self.avg_loss = self.atr = 0.0
+        self.obv = self.pv_sum = self.volume_sum = 0.0
+        self.window = deque(maxlen=window)
+        self.window_mean = self.window_m2 = 0.0
+
+class StreamingIndicators:
+    """O(1)-per-tick RSI, MACD, VWAP, Bollinger Bands, ATR and OBV per token.
+
+    EMAs are seeded with the first observation (pandas ewm adjust=False),
+    RSI and ATR use Wilder smoothing (alpha = 1/period), and Bollinger Bands
+    use the population standard deviation of the last `bollinger_period`
+    prices. Only closing prices are observed, so the true range for ATR is
+    the absolute close-to-close move. VWAP and OBV weight by the sampled
+    24h volume. tests/test_indicators.py checks the values against a
+    full-history pandas computation.
+    """
+    def __init__(self, rsi_period: int = 14, macd_fast: int = 12, macd_slow: int = 26, macd_signal: int = 9,
+                 bollinger_period: int = 20, bollinger_width: float = 2.0, atr_period: int = 14):
+        self.rsi_period = rsi_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.bollinger_period = bollinger_period
+        self.bollinger_width = bollinger_width
+        self.atr_period = atr_period
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def update(self, key: str, price: float, volume: float = 0.0):
+        """Fold one (price, volume) tick into the token's indicator state"""
+        if np.isnan(volume):
+            volume = 0.0
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = IndicatorState(self.bollinger_period)
+            state.ticks += 1
+            state.pv_sum += price * volume
+            state.volume_sum += volume
+
+            if state.last_price is None:
+                state.ema_fast = state.ema_slow = price
+                state.macd_signal = 0.0
+            else:
+                change = price - state.last_price
+                gain, loss, true_range = max(change, 0.0), max(-change, 0.0), abs(change)
+                if state.ticks == 2:
+                    state.avg_gain, state.avg_loss, state.atr = gain, loss, true_range
+                else:
+                    state.avg_gain += (gain - state.avg_gain) / self.rsi_period
+                    state.avg_loss += (loss - state.avg_loss) / self.rsi_period
+                    state.atr += (true_range - state.atr) / self.atr_period
+                state.obv += volume if change > 0 else -volume if change < 0 else 0.0
+                state.ema_fast += (price - state.ema_fast) * 2 / (self.macd_fast + 1)
+                state.ema_slow += (price - state.ema_slow) * 2 / (self.macd_slow + 1)
+                macd = state.ema_fast - state.ema_slow
+                state.macd_signal += (macd - state.macd_signal) * 2 / (self.macd_signal + 1)
+            state.last_price = price
+
+            # Sliding-window mean and sum of squared deviations for the Bollinger Bands
+            window = state.window
+            if len(window) == window.maxlen:
+                oldest = window[0]
+                window.append(price)
+                old_mean = state.window_mean
+                state.window_mean += (price - oldest) / len(window)
+                state.window_m2 += (price - oldest) * (price - state.window_mean + oldest - old_mean)
+            else:
+                window.append(price)
+                delta = price - state.window_mean
+                state.window_mean += delta / len(window)
+                state.window_m2 += delta * (price - state.window_mean)
+
+    def update_many(self, keys: List[str], prices: np.ndarray, volumes: np.ndarray):
+        for key, price, volume in zip(keys, prices, volumes):
+            self.update(key, float(price), float(volume))
+
+    def get(self, key: str) -> Optional[Dict[str, float]]:
+        """Current indicator values for a token, or None if it has never been observed"""
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                return None
+            macd = state.ema_fast - state.ema_slow
+            if state.ticks < 2:
+                rsi = np.nan
+            elif state.avg_loss == 0:
+                rsi = 100.0 if state.avg_gain > 0 else 50.0
+            else:
+                rsi = 100 - 100 / (1 + state.avg_gain / state.avg_loss)
+            std = np.sqrt(max(state.window_m2, 0.0) / len(state.window))
+            return {
+                'rsi': rsi,
+                'macd': macd,
+                'macd_signal': state.macd_signal,
+                'macd_hist': macd - state.macd_signal,
+                'vwap': state.pv_sum / state.volume_sum if state.volume_sum else np.nan,
+                'bollinger_mid': state.window_mean,
+                'bollinger_upper': state.window_mean + self.bollinger_width * std,
+                'bollinger_lower': state.window_mean - self.bollinger_width * std,
+                'atr': state.atr if state.ticks >= 2 else np.nan,
+                'obv': state.obv
+            }
+
+    def rsi_many(self, keys) -> np.ndarray:
+        """RSI column for many tokens (NaN where untracked) without building per-token dicts"""
+        gains = np.zeros(len(keys))
+        losses = np.zeros(len(keys))
+        ticks = np.zeros(len(keys), dtype=np.int64)
+        with self.lock:
+            for i, state in enumerate(map(self.states.get, keys)):
+                if state is not None:
+                    gains[i], losses[i], ticks[i] = state.avg_gain, state.avg_loss, state.ticks
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + gains / losses)
+        rsi[losses == 0] = np.where(gains[losses == 0] > 0, 100.0, 50.0)
+        rsi[ticks < 2] = np.nan
+        return rsi
+
+    def discard(self, key: str):
+        with self.lock:
+            self.states.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
 class PatternAnalyzer:
-    # Your existing PatternAnalyzer class remains unchanged
-    def __init__(self, buy_threshold: float = 1.1, sell_threshold: float = 0.8):
+    PATTERN_LABELS = np.array(["Insufficient Data", "Pump and Dump", "Whale Accumulation", "Steady Growth",
+                               "No Pattern"], dtype=object)
+    DECISIONS = np.array(['Buy', 'Sell', 'Hold'], dtype=object)
+
+    def __init__(self, buy_threshold: float = 1.1, sell_threshold: float = 0.8,
+                 history: Optional[TimeSeriesStore] = None, min_samples: int = 3):
         self.buy_threshold = buy_threshold
         self.sell_threshold = sell_threshold
+        self.history = history
+        self.min_samples = min_samples
 
     def detect_pump_and_dump(self, volume_data: pd.Series) -> bool:
         avg_volume = volume_data.mean()
@@ -60,18 +658,1261 @@ class PatternAnalyzer:
         current_volume = volume_data.iloc[-1]
         return current_volume < self.sell_threshold * avg_pump_volume
 
+    def analyze_batch(self, volumes: np.ndarray, mask: Optional[np.ndarray] = None,
+                      avg_pump_volume: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized analyze/should_buy/should_sell over a tokens x samples matrix.
+
+        Rows may be ragged: samples where mask is False (or the value is NaN) are
+        ignored and the rest are taken in order. Returns pattern labels plus buy
+        and sell flags; sell is only set where buy is not, mirroring evaluate.
+        Rows with fewer than min_samples samples are "Insufficient Data".
+        """
+        volumes = np.asarray(volumes, dtype=float)
+        valid = ~np.isnan(volumes) if mask is None else (np.asarray(mask, dtype=bool) & ~np.isnan(volumes))
+        # Move each row's valid samples to the right, preserving their order
+        order = np.argsort(valid, axis=1, kind='stable')
+        volumes = np.take_along_axis(volumes, order, axis=1)
+        valid = np.take_along_axis(valid, order, axis=1)
+
+        counts = valid.sum(axis=1)
+        enough = counts >= max(self.min_samples, 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_volume = np.where(valid, volumes, 0.0).sum(axis=1) / counts
+            max_volume = np.where(valid, volumes, -np.inf).max(axis=1)
+            min_volume = np.where(valid, volumes, np.inf).min(axis=1)
+            changes = (volumes[:, 1:] - volumes[:, :-1]) / volumes[:, :-1]
+        current_volume = volumes[:, -1]
+
+        pump_and_dump = (max_volume > 3 * avg_volume) & (min_volume < 0.5 * avg_volume)
+        whale = max_volume > 2 * avg_volume
+        paired = valid[:, 1:] & valid[:, :-1]
+        steady = np.all(~paired | ((-0.05 < changes) & (changes < 0.10)), axis=1)
+
+        # Index into shared label objects rather than creating a string per row
+        labels = self.PATTERN_LABELS[np.select([~enough, pump_and_dump, whale, steady], [0, 1, 2, 3], default=4)]
+        if avg_pump_volume is None:
+            avg_pump_volume = avg_volume * 1.5
+        buy = enough & (current_volume > self.buy_threshold * avg_volume)
+        sell = enough & ~buy & (current_volume < self.sell_threshold * np.asarray(avg_pump_volume, dtype=float))
+        return labels, buy, sell
+
+    def evaluate_many(self, keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Patterns and Buy/Sell/Hold decisions for many pairs in one vectorized pass"""
+        if self.history is None or not keys:
+            return (np.full(len(keys), "Insufficient Data", dtype=object),
+                    np.full(len(keys), 'Hold', dtype=object))
+        volumes, mask = self.history.matrix(keys, 'volume')
+        labels, buy, sell = self.analyze_batch(volumes, mask)
+        decisions = self.DECISIONS[np.select([buy, sell], [0, 1], default=2)]
+        return labels, decisions
+
+class TokenRow:
+    """Read-only dict-style view of one TokenBatch row.
+
+    get() treats None and NaN as missing, like absent keys in the dicts
+    built by get_token_info.
+    """
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch: 'TokenBatch', index: int):
+        self.batch = batch
+        self.index = index
+
+    def __getitem__(self, key: str):
+        if key == 'timestamp':
+            return self.batch.timestamp
+        if key not in TokenBatch.ROW_FIELD_SET:
+            raise KeyError(key)
+        return getattr(self.batch, key).item(self.index)
+
+    def get(self, key: str, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        if value is None or value != value:
+            return default
+        return value
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in ('timestamp',) + TokenBatch.ROW_FIELDS}
+
+class TokenBatch:
+    """One scan's pairs as parallel columns instead of a dict per pair.
+
+    Numeric fields are parsed once into float arrays (NaN when missing),
+    strings are interned so chains, DEXes, symbols and addresses seen every
+    scan share one object, and the batch carries a single timestamp.
+    Filtering selects rows with take(); analysis writes pattern, decision and
+    rsi columns in place. Rows are only materialized as TokenRow views for
+    display.
+    """
+    STRING_FIELDS = ('token_name', 'token_symbol', 'token_address', 'chain', 'dex', 'pair_address')
+    NUMERIC_FIELDS = ('price_usd', 'price_change_24h', 'volume_24h', 'liquidity_usd', 'created_at')
+    ANALYSIS_FIELDS = ('rsi', 'pattern', 'decision')
+    ROW_FIELDS = STRING_FIELDS + NUMERIC_FIELDS + ANALYSIS_FIELDS
+    ROW_FIELD_SET = frozenset(ROW_FIELDS)
+    __slots__ = ('timestamp',) + ROW_FIELDS
+
+    def __init__(self, timestamp: str, columns: Dict[str, np.ndarray]):
+        self.timestamp = timestamp
+        size = len(columns['pair_address'])
+        for field in self.STRING_FIELDS + self.NUMERIC_FIELDS:
+            setattr(self, field, columns[field])
+        self.rsi = columns.get('rsi', np.full(size, np.nan))
+        self.pattern = columns.get('pattern', np.full(size, None, dtype=object))
+        self.decision = columns.get('decision', np.full(size, None, dtype=object))
+
+    @classmethod
+    def from_pairs(cls, pairs: List[Dict], timestamp: Optional[str] = None) -> 'TokenBatch':
+        """Columnar equivalent of get_token_info for a batch of DexScreener pairs"""
+        rows = []
+        for pair in pairs:
+            base = pair.get('baseToken') or {}
+            rows.append((base.get('name'), base.get('symbol'), base.get('address'), pair.get('chainId'),
+                         pair.get('dexId'), pair.get('pairAddress'), pair.get('priceUsd'),
+                         (pair.get('priceChange') or {}).get('h24'), (pair.get('volume') or {}).get('h24'),
+                         (pair.get('liquidity') or {}).get('usd'), pair.get('pairCreatedAt')))
+        values = list(zip(*rows)) if rows else [()] * len(cls.STRING_FIELDS + cls.NUMERIC_FIELDS)
+        intern = sys.intern
+        columns = {}
+        for field, column in zip(cls.STRING_FIELDS, values):
+            strings = np.empty(len(column), dtype=object)
+            strings[:] = [intern(value) if type(value) is str else value for value in column]
+            columns[field] = strings
+        for field, column in zip(cls.NUMERIC_FIELDS, values[len(cls.STRING_FIELDS):]):
+            columns[field] = cls.parse_numbers(column)
+        return cls(timestamp or datetime.now().isoformat(), columns)
+
+    @staticmethod
+    def parse_numbers(values) -> np.ndarray:
+        try:
+            return np.array([np.nan if value is None else value for value in values], dtype=float)
+        except (TypeError, ValueError):
+            # Some value is not numeric; coerce those to NaN one by one
+            return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+    def take(self, index: np.ndarray) -> 'TokenBatch':
+        """Rows selected by a boolean mask or integer index array"""
+        return TokenBatch(self.timestamp, {field: getattr(self, field)[index] for field in self.ROW_FIELDS})
+
+    def db_rows(self) -> zip:
+        """Rows in SnapshotStore.COLUMNS order; SQLite stores NaN as NULL"""
+        ts = datetime.fromisoformat(self.timestamp).timestamp()
+        pair_addresses = [address or '' for address in self.pair_address.tolist()]
+        return zip(pair_addresses, [ts] * len(self), self.token_name.tolist(), self.token_symbol.tolist(),
+                   self.token_address.tolist(), self.chain.tolist(), self.dex.tolist(),
+                   *(getattr(self, field).tolist() for field in self.NUMERIC_FIELDS),
+                   self.pattern.tolist(), self.decision.tolist(), self.rsi.tolist())
+
+    def __len__(self) -> int:
+        return len(self.pair_address)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(index)
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return TokenRow(self, index % len(self))
+
+    def __iter__(self):
+        return (TokenRow(self, index) for index in range(len(self)))
+
+class AlertRule:
+    """A conjunction of field comparisons, optionally limited to one chain"""
+    OPERATORS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+                 '==': np.equal, '!=': np.not_equal}
+    NUMERIC_FIELDS = TokenBatch.NUMERIC_FIELDS + ('rsi',)
+    TEXT_FIELDS = ('pattern', 'decision', 'dex', 'token_symbol', 'token_address')
+
+    def __init__(self, rule_id: str, conditions: List, chain: Optional[str] = None,
+                 name: Optional[str] = None, cooldown: float = 300.0):
+        if not conditions:
+            raise ValueError(f"Alert rule {rule_id} has no conditions")
+        self.id = str(rule_id)
+        self.chain = chain
+        self.name = name or self.id
+        self.cooldown = float(cooldown)
+        self.conditions = []
+        for field, op, value in conditions:
+            if op not in self.OPERATORS:
+                raise ValueError(f"Alert rule {rule_id}: unknown operator {op!r}")
+            if field in self.NUMERIC_FIELDS:
+                value = float(value)
+            elif field in self.TEXT_FIELDS:
+                if op not in ('==', '!='):
+                    raise ValueError(f"Alert rule {rule_id}: {field} only supports == and !=")
+                value = str(value)
+            else:
+                raise ValueError(f"Alert rule {rule_id}: unknown field {field!r}")
+            self.conditions.append((field, op, value))
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'AlertRule':
+        return cls(spec['id'], spec['when'], spec.get('chain'), spec.get('name'), spec.get('cooldown', 300.0))
+
+    def matches(self, token) -> bool:
+        """Reference check of one token (a dict or TokenRow); AlertEngine evaluates rules in bulk"""
+        if self.chain is not None and token.get('chain') != self.chain:
+            return False
+        for field, op, value in self.conditions:
+            actual = token.get(field)
+            if actual is None or not self.OPERATORS[op](actual, value):
+                return False
+        return True
+
+    def describe(self) -> str:
+        text = ' and '.join(f"{field} {op} {value:g}" if isinstance(value, float) else f"{field} {op} {value}"
+                            for field, op, value in self.conditions)
+        return f"{text} on {self.chain}" if self.chain else text
+
+def load_alert_rules(path: str) -> List[AlertRule]:
+    """Rules from a JSON list of {"id", "when": [[field, op, value], ...], "chain", "name", "cooldown"}"""
+    if not Path(path).exists():
+        return []
+    try:
+        with open(path, 'r') as f:
+            specs = json.load(f)
+    except Exception as e:
+        logging.error(f"Error loading alert rules from {path}: {e}")
+        return []
+    rules = []
+    for spec in specs.get('rules', []) if isinstance(specs, dict) else specs:
+        try:
+            rules.append(AlertRule.from_dict(spec))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"Skipping alert rule {spec!r}: {e}")
+    return rules
+
+class AlertEngine:
+    """Evaluates many AlertRules on every scan without a rules x tokens Python loop.
+
+    Rules are compiled per chain (rules without a chain apply to all chains)
+    into tests that share a field and operator, so each test is one broadcast
+    comparison of a token column against every rule's threshold. Only tokens
+    whose watched fields changed since they were last seen are evaluated.
+    A rule fires for a pair when its conditions become true, not again while
+    they stay true, and at most once per the rule's cooldown; firings beyond
+    max_per_cycle for one rule in one scan are suppressed and counted.
+    """
+    def __init__(self, rules: Optional[List[AlertRule]] = None, max_per_cycle: int = 20, history: int = 500):
+        self.rules = OrderedDict()
+        self.max_per_cycle = max_per_cycle
+        self.compiled = None
+        self.rule_ids = []
+        self.fields = ()
+        # One slot per pair: the watched field values last seen and which rules held for them
+        self.slots = {}
+        self.free_slots = []
+        self.values = {}
+        self.seen = np.zeros(0, dtype=bool)
+        self.matching = np.zeros((0, 0), dtype=bool)
+        self.last_fired = {}
+        self.recent = deque(maxlen=history)
+        self.fired = 0
+        self.suppressed = 0
+        self.lock = threading.RLock()
+        for rule in rules or []:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: AlertRule):
+        with self.lock:
+            self.rules[rule.id] = rule
+            self.compiled = None
+
+    def remove_rule(self, rule_id: str):
+        with self.lock:
+            self.rules.pop(rule_id, None)
+            self.compiled = None
+
+    def compile(self) -> Dict:
+        """Group every rule's conditions into per-chain (field, operator) tests"""
+        groups = {}
+        for index, rule in enumerate(self.rules.values()):
+            group = groups.setdefault(rule.chain, {'rules': [], 'numeric': {}, 'text': {}})
+            position = len(group['rules'])
+            group['rules'].append(index)
+            repeats = {}
+            for field, op, value in rule.conditions:
+                # A rule comparing one field twice with the same operator lands in separate tests
+                repeat = repeats[(field, op)] = repeats.get((field, op), -1) + 1
+                if field in AlertRule.NUMERIC_FIELDS:
+                    positions, thresholds = group['numeric'].setdefault((field, op, repeat), ([], []))
+                    positions.append(position)
+                    thresholds.append(value)
+                else:
+                    group['text'].setdefault((field, op, repeat, value), []).append(position)
+        self.compiled = {
+            chain: (np.array(group['rules']),
+                    [(field, op, np.array(positions), np.array(thresholds))
+                     for (field, op, _), (positions, thresholds) in group['numeric'].items()],
+                    [(field, op, value, np.array(positions))
+                     for (field, op, _, value), positions in group['text'].items()])
+            for chain, group in groups.items()
+        }
+
+        # Keep the match state of rules that survived the change so they do not fire again
+        rule_ids = list(self.rules)
+        kept = {rule_id: i for i, rule_id in enumerate(self.rule_ids)}
+        matching = np.zeros((len(self.seen), len(rule_ids)), dtype=bool)
+        for i, rule_id in enumerate(rule_ids):
+            if rule_id in kept:
+                matching[:, i] = self.matching[:, kept[rule_id]]
+        self.matching, self.rule_ids = matching, rule_ids
+
+        fields = tuple(sorted({field for rule in self.rules.values() for field, _, _ in rule.conditions}))
+        if fields != self.fields:
+            # Newly watched fields have no previous values; treat every pair as changed once
+            self.fields = fields
+            self.values = {field: self.empty_column(field, len(self.seen)) for field in fields}
+            self.seen[:] = False
+        return self.compiled
+
+    @staticmethod
+    def empty_column(field: str, size: int) -> np.ndarray:
+        if field in AlertRule.NUMERIC_FIELDS:
+            return np.full(size, np.nan)
+        return np.full(size, None, dtype=object)
+
+    def slot_for(self, key: str) -> int:
+        slot = self.slots.get(key)
+        if slot is None:
+            if not self.free_slots:
+                size = len(self.seen)
+                grown = max(64, size * 2)
+                self.seen = np.concatenate([self.seen, np.zeros(grown - size, dtype=bool)])
+                self.matching = np.concatenate([self.matching, np.zeros((grown - size, len(self.rule_ids)), dtype=bool)])
+                for field in self.fields:
+                    self.values[field] = np.concatenate([self.values[field], self.empty_column(field, grown - size)])
+                self.free_slots = list(range(grown - 1, size - 1, -1))
+            slot = self.slots[key] = self.free_slots.pop()
+            self.seen[slot] = False
+            self.matching[slot] = False
+        return slot
+
+    def discard(self, key: str):
+        """Forget a pair, e.g. when the history store evicts it"""
+        with self.lock:
+            slot = self.slots.pop(key, None)
+            if slot is not None:
+                self.free_slots.append(slot)
+
+    def changed_rows(self, batch: TokenBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """Indexes and slots of rows whose watched fields differ from the last time the pair was seen"""
+        slots = np.fromiter(map(self.slot_for, batch.pair_address), dtype=np.int64, count=len(batch))
+        changed = ~self.seen[slots]
+        for field in self.fields:
+            previous, current = self.values[field][slots], getattr(batch, field)
+            if field in AlertRule.NUMERIC_FIELDS:
+                changed |= (previous != current) & ~(np.isnan(previous) & np.isnan(current))
+            else:
+                changed |= previous != current
+            self.values[field][slots] = current
+        self.seen[slots] = True
+        rows = np.flatnonzero(changed)
+        return rows, slots[rows]
+
+    def evaluate(self, batch: TokenBatch, now: Optional[float] = None) -> List[Dict]:
+        """Alerts fired by this scan's tokens"""
+        with self.lock:
+            if not self.rules or not len(batch):
+                return []
+            compiled = self.compiled if self.compiled is not None else self.compile()
+            rows, slots = self.changed_rows(batch)
+            ok = np.zeros((len(rows), len(self.rule_ids)), dtype=bool)
+            for chain, (rule_indexes, numeric_tests, text_tests) in compiled.items():
+                group = np.arange(len(rows)) if chain is None else np.flatnonzero(batch.chain[rows] == chain)
+                if not len(group):
+                    continue
+                group_rows = rows[group]
+                group_ok = np.ones((len(group), len(rule_indexes)), dtype=bool)
+                for field, op, positions, thresholds in numeric_tests:
+                    column = getattr(batch, field)[group_rows]
+                    # Missing values never satisfy a condition
+                    group_ok[:, positions] &= (AlertRule.OPERATORS[op](column[:, None], thresholds)
+                                               & ~np.isnan(column)[:, None])
+                for field, op, value, positions in text_tests:
+                    column = getattr(batch, field)[group_rows]
+                    group_ok[:, positions] &= (AlertRule.OPERATORS[op](column, value) & pd.notna(column))[:, None]
+                ok[group[:, None], rule_indexes] = group_ok
+            # Only rules that just became true for a pair can fire
+            rising = ok & ~self.matching[slots]
+            self.matching[slots] = ok
+            return self.fire(batch, rows, rising, time.time() if now is None else now)
+
+    def fire(self, batch: TokenBatch, rows: np.ndarray, rising: np.ndarray, now: float) -> List[Dict]:
+        """Throttle the rules that just became true and build their alerts"""
+        alerts = []
+        per_rule = {}
+        positions, indexes = np.nonzero(rising)
+        for row, index in zip(rows[positions].tolist(), indexes.tolist()):
+            rule = self.rules[self.rule_ids[index]]
+            key = batch.pair_address[row]
+            if now - self.last_fired.get((rule.id, key), -np.inf) < rule.cooldown \
+                    or per_rule.get(rule.id, 0) >= self.max_per_cycle:
+                self.suppressed += 1
+                continue
+            per_rule[rule.id] = per_rule.get(rule.id, 0) + 1
+            self.last_fired[(rule.id, key)] = now
+            alerts.append({
+                'rule': rule.id, 'name': rule.name, 'fired_at': now, 'pair_address': key,
+                'token_address': batch.token_address[row], 'token_symbol': batch.token_symbol[row],
+                'chain': batch.chain[row], 'price_usd': batch.price_usd.item(row),
+                'values': {field: getattr(batch, field).item(row) for field, _, _ in rule.conditions}
+            })
+        self.fired += len(alerts)
+        self.recent.extend(alerts)
+        if len(self.last_fired) > 100000:
+            longest = max((rule.cooldown for rule in self.rules.values()), default=0.0)
+            self.last_fired = {key: fired for key, fired in self.last_fired.items() if now - fired < longest}
+        return alerts
+
+class SnapshotStore:
+    """SQLite (WAL mode) store of scan snapshots.
+
+    Rows are clustered on (pair_address, ts) so one pair's history is a
+    contiguous range read. Secondary indexes on (token_address, ts),
+    (chain, ts) and ts act as the time/chain partitions: a chain's time
+    range, or everything older than a cutoff, is found without scanning the
+    rest of the table.
+    """
+    COLUMNS = ('pair_address', 'ts', 'token_name', 'token_symbol', 'token_address', 'chain', 'dex',
+               'price_usd', 'price_change_24h', 'volume_24h', 'liquidity_usd', 'created_at',
+               'pattern', 'decision', 'rsi')
+    NUMERIC_COLUMNS = ('price_usd', 'price_change_24h', 'volume_24h', 'liquidity_usd', 'created_at', 'rsi')
+
+    def __init__(self, path: str = 'memecoin_data.db'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        # Each scan touches every pair's leaf page; keep the hot part of the B-trees cached
+        self.conn.execute('PRAGMA cache_size=-65536')
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    pair_address TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    token_name TEXT,
+                    token_symbol TEXT,
+                    token_address TEXT,
+                    chain TEXT,
+                    dex TEXT,
+                    price_usd REAL,
+                    price_change_24h REAL,
+                    volume_24h REAL,
+                    liquidity_usd REAL,
+                    created_at INTEGER,
+                    pattern TEXT,
+                    decision TEXT,
+                    rsi REAL,
+                    PRIMARY KEY (pair_address, ts)
+                ) WITHOUT ROWID''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_token ON snapshots (token_address, ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_chain ON snapshots (chain, ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_ts ON snapshots (ts)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS imports (
+                    path TEXT PRIMARY KEY,
+                    rows INTEGER,
+                    imported_at TEXT
+                )''')
+
+    @staticmethod
+    def to_row(token: Dict, ts: float) -> Tuple:
+        return (token.get('pair_address') or '', ts, token.get('token_name'), token.get('token_symbol'),
+                token.get('token_address'), token.get('chain'), token.get('dex'),
+                *(SnapshotStore.to_number(token.get(column)) for column in SnapshotStore.NUMERIC_COLUMNS[:5]),
+                token.get('pattern'), token.get('decision'), SnapshotStore.to_number(token.get('rsi')))
+
+    @staticmethod
+    def to_number(value) -> Optional[float]:
+        if value is None:
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return value if value == value else None
+
+    def write_batch(self, tokens) -> int:
+        """Insert one scan's tokens (a TokenBatch or a list of dicts) in a single transaction"""
+        if isinstance(tokens, TokenBatch):
+            rows = tokens.db_rows()
+        else:
+            rows = []
+            parsed = {}
+            for token in tokens:
+                timestamp = token.get('timestamp') or datetime.now().isoformat()
+                if timestamp not in parsed:
+                    parsed[timestamp] = datetime.fromisoformat(str(timestamp)).timestamp()
+                rows.append(self.to_row(token, parsed[timestamp]))
+        placeholders = ', '.join('?' * len(self.COLUMNS))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO snapshots ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", rows)
+        return len(tokens)
+
+    def query(self, where: str = '', params: Tuple = ()) -> pd.DataFrame:
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM snapshots {where}"
+        with self.lock:
+            frame = pd.read_sql_query(sql, self.conn, params=params)
+        local_zone = datetime.now().astimezone().tzinfo
+        timestamps = pd.to_datetime(frame['ts'], unit='s', utc=True).dt.tz_convert(local_zone).dt.tz_localize(None).dt.round('us')
+        frame.insert(0, 'timestamp', timestamps)
+        return frame
+
+    @staticmethod
+    def time_bounds(start: Optional[datetime], end: Optional[datetime]) -> Tuple[float, float]:
+        return (start.timestamp() if start else -np.inf, end.timestamp() if end else np.inf)
+
+    def pair_history(self, pair_address: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> pd.DataFrame:
+        """All snapshots of one pair, oldest first (a range read on the primary key)"""
+        return self.query('WHERE pair_address = ? AND ts BETWEEN ? AND ? ORDER BY ts',
+                          (pair_address, *self.time_bounds(start, end)))
+
+    def token_history(self, token_address: str, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> pd.DataFrame:
+        """All snapshots of one token across its pairs, oldest first"""
+        return self.query('WHERE token_address = ? AND ts BETWEEN ? AND ? ORDER BY ts',
+                          (token_address, *self.time_bounds(start, end)))
+
+    def range_query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    chain: Optional[str] = None) -> pd.DataFrame:
+        """Snapshots in a time range, optionally limited to one chain partition"""
+        if chain:
+            return self.query('WHERE chain = ? AND ts BETWEEN ? AND ? ORDER BY ts',
+                              (chain, *self.time_bounds(start, end)))
+        return self.query('WHERE ts BETWEEN ? AND ? ORDER BY ts', self.time_bounds(start, end))
+
+    def prune(self, before: datetime) -> int:
+        """Delete snapshots older than `before`"""
+        with self.lock, self.conn:
+            return self.conn.execute('DELETE FROM snapshots WHERE ts < ?', (before.timestamp(),)).rowcount
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+
+    def import_csv(self, csv_path: str, chunksize: int = 50000) -> int:
+        """One-shot import of a legacy memecoin_data.csv; re-importing the same file is a no-op"""
+        resolved = str(Path(csv_path).resolve())
+        with self.lock:
+            if self.conn.execute('SELECT 1 FROM imports WHERE path = ?', (resolved,)).fetchone():
+                logging.info(f"{csv_path} was already imported into {self.path}")
+                return 0
+        imported = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str, keep_default_na=False):
+            chunk = chunk.replace('', None)
+            imported += self.write_batch(chunk.to_dict('records'))
+        with self.lock, self.conn:
+            self.conn.execute('INSERT INTO imports VALUES (?, ?, ?)', (resolved, imported, datetime.now().isoformat()))
+        logging.info(f"Imported {imported} rows from {csv_path} into {self.path}")
+        return imported
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class BacktestEngine:
+    """Replays recorded snapshots through PatternAnalyzer's buy/sell rules.
+
+    Observations are kept in long format, sorted by pair and then time, so
+    every per-pair computation is a segmented NumPy pass over one array
+    covering all pairs and time buckets. The rolling windows reproduce what
+    evaluate_many sees live (the last `window` observed samples of a pair,
+    including the current one). Orders are one unit per signal like
+    analyze_results, sells never take a position below zero, and fills pay a
+    proportional fee. Capital is not a constraint.
+    """
+    def __init__(self, historical_data: pd.DataFrame, freq: str = '1min', window: int = 64):
+        self.freq = freq
+        self.window = window
+        self.strategies = []
+        self.equity_curves = []
+        self.data = self.prepare(historical_data)
+
+    @classmethod
+    def from_store(cls, store: SnapshotStore, start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None, chain: Optional[str] = None, **kwargs) -> 'BacktestEngine':
+        return cls(store.range_query(start_date, end_date, chain), **kwargs)
+
+    @classmethod
+    def from_csv(cls, path: str = 'memecoin_data.csv', chain: Optional[str] = None, **kwargs) -> 'BacktestEngine':
+        columns = ['timestamp', 'pair_address', 'price_usd', 'volume_24h'] + (['chain'] if chain else [])
+        data = pd.read_csv(path, usecols=columns)
+        return cls(data[data['chain'] == chain] if chain else data, **kwargs)
+
+    def prepare(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Bucket observations in time and sort them by pair, then time"""
+        frame = pd.DataFrame({
+            'timestamp': pd.to_datetime(data['timestamp'], format='ISO8601'),
+            'pair': pd.Categorical(data['pair_address']).codes,
+            'price': pd.to_numeric(data['price_usd'], errors='coerce'),
+            'volume': pd.to_numeric(data['volume_24h'], errors='coerce')
+        })
+        # evaluate_many ignores samples without a volume, so they are not observations here either
+        frame = frame[frame['price'].notna() & frame['volume'].notna() & (frame['price'] > 0)]
+        frame['bucket'] = frame['timestamp'].dt.floor(self.freq)
+        frame = frame.sort_values(['pair', 'bucket', 'timestamp'], kind='stable')
+        frame = frame.drop_duplicates(['pair', 'bucket'], keep='last')
+        return frame.reset_index(drop=True)
+
+    def add_strategy(self, strategy: PatternAnalyzer):
+        self.strategies.append(strategy)
+
+    @staticmethod
+    def group_starts(pairs: np.ndarray) -> np.ndarray:
+        """Index of the first observation of each row's pair"""
+        first = np.ones(len(pairs), dtype=bool)
+        first[1:] = pairs[1:] != pairs[:-1]
+        return np.maximum.accumulate(np.where(first, np.arange(len(pairs)), 0))
+
+    def rolling_volume(self, volume: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean and count of each pair's last `window` volume samples at every observation"""
+        index = np.arange(len(volume))
+        cumulative = np.concatenate([[0.0], np.cumsum(volume)])
+        window_start = np.maximum(index - self.window + 1, starts)
+        counts = index - window_start + 1
+        return (cumulative[index + 1] - cumulative[window_start]) / counts, counts
+
+    def signals(self, strategy: PatternAnalyzer, volume: np.ndarray, avg_volume: np.ndarray,
+                counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Buy and sell flags per observation, as PatternAnalyzer.analyze_batch decides them live"""
+        enough = counts >= max(strategy.min_samples, 1)
+        buy = enough & (volume > strategy.buy_threshold * avg_volume)
+        sell = enough & ~buy & (volume < strategy.sell_threshold * avg_volume * 1.5)
+        return buy, sell
+
+    def columns(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Arrays shared by every strategy run over the same data"""
+        pairs = data['pair'].to_numpy()
+        volume = data['volume'].to_numpy()
+        starts = self.group_starts(pairs)
+        first = starts == np.arange(len(pairs))
+        time_index, buckets = pd.factorize(data['bucket'], sort=True)
+        avg_volume, counts = self.rolling_volume(volume, starts)
+        return {
+            'price': data['price'].to_numpy(), 'volume': volume, 'starts': starts, 'first': first,
+            'group_index': np.cumsum(first) - 1, 'buckets': buckets, 'time_index': time_index,
+            'avg_volume': avg_volume, 'counts': counts
+        }
+
+    def run_strategy(self, strategy: PatternAnalyzer, columns: Dict[str, np.ndarray], trade_size: float = 1.0,
+                     fee: float = 0.003, initial_capital: float = 10000.0) -> Tuple[Dict, pd.Series]:
+        price, starts, first = columns['price'], columns['starts'], columns['first']
+        buy, sell = self.signals(strategy, columns['volume'], columns['avg_volume'], columns['counts'])
+        # Position path max(0, prev + order) per pair, in whole units:
+        # cumulative orders minus their running minimum below zero
+        orders = buy.astype(np.int64) - sell.astype(np.int64)
+        cumulative = np.cumsum(orders)
+        cumulative -= np.concatenate([[0], cumulative])[starts]
+        # Offsetting each pair below all earlier ones lets one global running minimum restart per pair
+        offset = columns['group_index'] * (2 * len(price) + 1)
+        floor = np.minimum(np.minimum.accumulate(cumulative - offset) + offset, 0)
+        position = (cumulative - floor) * trade_size
+        previous_position = np.where(first, 0.0, np.concatenate([[0.0], position[:-1]]))
+        executed = position - previous_position
+
+        notional = executed * price
+        fees = np.abs(notional) * fee
+        # Change in each pair's mark-to-market value, summed per time bucket
+        holding_value = position * price
+        previous_value = np.where(first, 0.0, np.concatenate([[0.0], holding_value[:-1]]))
+        buckets = columns['buckets']
+        equity = initial_capital + np.cumsum(np.bincount(
+            columns['time_index'], weights=holding_value - previous_value - notional - fees, minlength=len(buckets)))
+        equity_curve = pd.Series(equity, index=buckets, name='equity')
+
+        returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.empty(0)
+        periods_per_year = pd.Timedelta(days=365) / pd.Timedelta(self.freq)
+        std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+        peak = np.maximum.accumulate(equity)
+        metrics = {
+            'buy_threshold': strategy.buy_threshold,
+            'sell_threshold': strategy.sell_threshold,
+            'trades': int(np.count_nonzero(executed)),
+            'fees': float(fees.sum()),
+            'pnl': float(equity[-1] - initial_capital) if len(equity) else 0.0,
+            'return': float(equity[-1] / initial_capital - 1) if len(equity) else 0.0,
+            'sharpe': float(returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+            'max_drawdown': float(((peak - equity) / peak).max()) if len(equity) else 0.0
+        }
+        return metrics, equity_curve
+
+    def run_backtest(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                     **kwargs) -> pd.DataFrame:
+        """P&L, Sharpe and max drawdown for every strategy; equity curves are kept in self.equity_curves"""
+        data = self.data
+        if start_date is not None:
+            data = data[data['bucket'] >= start_date]
+        if end_date is not None:
+            data = data[data['bucket'] <= end_date]
+        columns = self.columns(data)
+        results = []
+        self.equity_curves = []
+        for strategy in self.strategies or [PatternAnalyzer()]:
+            metrics, equity_curve = self.run_strategy(strategy, columns, **kwargs)
+            results.append(metrics)
+            self.equity_curves.append(equity_curve)
+        return pd.DataFrame(results)
+
+class FillEngine:
+    """Constant-product (x * y = k) fill simulation for batches of paper orders.
+
+    A pair's pool is modelled from its reported USD liquidity: half of it is
+    the quote reserve y and y / price the base reserve x. Buying q tokens
+    from the pool costs y * q / (x - q) before fees (a negative q is a sell),
+    so the fills of a whole batch come from cumulative net quantities per
+    pool: each order pays the difference between the pool's cost curve
+    after it and before it, exactly as if the orders had hit the pool one
+    after another.
+    """
+    def __init__(self, fee: float = 0.003):
+        self.fee = fee
+
+    def fill(self, pools: np.ndarray, quantities: np.ndarray, prices: np.ndarray,
+             liquidities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Signed quote amounts (positive = paid) and a mask of orders the pools can fill"""
+        quantities = np.asarray(quantities, dtype=float)
+        prices = np.asarray(prices, dtype=float)
+        liquidities = np.asarray(liquidities, dtype=float)
+        codes = pd.factorize(pd.Series(pools, dtype=object))[0]
+        after = pd.Series(quantities).groupby(codes).cumsum().to_numpy()
+        before = after - quantities
+
+        has_pool = np.isfinite(liquidities) & (liquidities > 0)
+        quote_reserve = np.where(has_pool, liquidities / 2, 1.0)
+        base_reserve = quote_reserve / prices
+        fillable = ~has_pool | (after < base_reserve)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            curve_after = quote_reserve * after / (base_reserve - after)
+            curve_before = quote_reserve * before / (base_reserve - before)
+        raw = np.where(has_pool, curve_after - curve_before, quantities * prices)
+        # The fee is charged on what goes into the pool: extra quote on buys, less quote out on sells
+        quote = np.where(quantities > 0, raw / (1 - self.fee), raw * (1 - self.fee))
+        return quote, fillable & np.isfinite(quote)
+
+class PositionLedger:
+    """Positions, cost basis and realized P&L maintained incrementally from fills.
+
+    With method='average' a sell realizes against the average cost of the
+    open quantity; with method='fifo' it consumes the oldest lots first.
+    Each fill is O(1) (amortized for FIFO), so valuing the portfolio never
+    rescans the trade history. The trade history remains the source of
+    truth and rebuild() replays it into a fresh state.
+    """
+    def __init__(self, method: str = 'average'):
+        if method not in ('average', 'fifo'):
+            raise ValueError(f"Unknown cost basis method: {method}")
+        self.method = method
+        self.quantities = {}
+        self.cost = {}
+        self.lots = {}
+        self.realized = {}
+
+    def apply(self, trade: Dict):
+        token, amount = trade['token_address'], float(trade['amount'])
+        # Fees are part of the cost (or reduce the proceeds) when the fill reports its value
+        value = float(trade.get('value', trade['price'] * amount))
+        quantity = self.quantities.get(token, 0.0)
+        if trade['side'] == 'buy':
+            self.quantities[token] = quantity + amount
+            self.cost[token] = self.cost.get(token, 0.0) + value
+            if self.method == 'fifo':
+                self.lots.setdefault(token, deque()).append([amount, value / amount])
+            return
+
+        amount = min(amount, quantity)
+        if amount <= 0:
+            return
+        proceeds = value * amount / float(trade['amount'])
+        if self.method == 'average':
+            basis = self.cost[token] * amount / quantity
+        else:
+            basis, remaining, lots = 0.0, amount, self.lots[token]
+            while remaining > 1e-12 and lots:
+                lot = lots[0]
+                used = min(lot[0], remaining)
+                basis += used * lot[1]
+                remaining -= used
+                lot[0] -= used
+                if lot[0] <= 1e-12:
+                    lots.popleft()
+        self.realized[token] = self.realized.get(token, 0.0) + proceeds - basis
+        if quantity - amount > 1e-12:
+            self.quantities[token] = quantity - amount
+            self.cost[token] -= basis
+        else:
+            for book in (self.quantities, self.cost, self.lots):
+                book.pop(token, None)
+
+    def average_cost(self, token: str) -> float:
+        quantity = self.quantities.get(token, 0.0)
+        return self.cost.get(token, 0.0) / quantity if quantity else 0.0
+
+    def unrealized_pnl(self, token: str, price: float) -> float:
+        return self.quantities.get(token, 0.0) * price - self.cost.get(token, 0.0)
+
+    def realized_pnl(self, token: Optional[str] = None) -> float:
+        if token is None:
+            return sum(self.realized.values())
+        return self.realized.get(token, 0.0)
+
+    def to_dict(self) -> Dict:
+        return {
+            'method': self.method,
+            'quantities': dict(self.quantities),
+            'cost': dict(self.cost),
+            'lots': {token: [list(lot) for lot in lots] for token, lots in self.lots.items()},
+            'realized': dict(self.realized)
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'PositionLedger':
+        ledger = cls(state.get('method', 'average'))
+        ledger.quantities = dict(state.get('quantities', {}))
+        ledger.cost = dict(state.get('cost', {}))
+        ledger.lots = {token: deque(list(lot) for lot in lots) for token, lots in state.get('lots', {}).items()}
+        ledger.realized = dict(state.get('realized', {}))
+        return ledger
+
+    def rebuild(self, trades: List[Dict]):
+        """Reset and replay an append-only trade log"""
+        self.quantities, self.cost, self.lots, self.realized = {}, {}, {}, {}
+        for trade in trades:
+            self.apply(trade)
+
+class TradeJournal:
+    """Append-only, fsync-batched journal of paper fills with compacted snapshots.
+
+    Fills are queued by the trading thread and written by a background
+    writer, which drains everything queued, appends it as JSON lines and
+    fsyncs once per batch (group commit). A snapshot captures capital,
+    ledger state and the most recent trades as of a journal sequence
+    number; once it is safely on disk the current journal segment is
+    archived and a fresh one started, so recovery only ever reads the
+    snapshot plus the fills written after it. Archived segments keep the
+    full history for replay_all().
+    """
+    def __init__(self, path: str = 'paper_trader.journal', snapshot_path: str = 'paper_trader.snapshot.json',
+                 snapshot_every: int = 1000, history_tail: int = 1000, max_batch: int = 512):
+        self.path = Path(path)
+        self.snapshot_path = Path(snapshot_path)
+        self.snapshot_every = snapshot_every
+        self.history_tail = history_tail
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = None
+        self.file = None
+
+    @staticmethod
+    def encode_trade(trade: Dict) -> Dict:
+        return {**trade, 'timestamp': trade['timestamp'].isoformat()}
+
+    @staticmethod
+    def decode_trade(trade: Dict) -> Dict:
+        return {**trade, 'timestamp': datetime.fromisoformat(trade['timestamp'])}
+
+    @staticmethod
+    def read_entries(path: Path) -> List[Dict]:
+        entries = []
+        if not path.exists():
+            return entries
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; everything before it is intact
+                    logging.warning(f"Ignoring truncated entry at the end of {path}")
+                    break
+        return entries
+
+    @staticmethod
+    def repair(path: Path):
+        """Cut a torn final line left by a crash, so the next append starts on a line of its own"""
+        if not path.exists():
+            return
+        intact = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                intact += len(line)
+            size = f.seek(0, os.SEEK_END)
+        if intact < size:
+            logging.warning(f"Truncating {size - intact} bytes of torn entries at the end of {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(intact)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self) -> Tuple[Optional[Dict], List[Dict]]:
+        """Latest snapshot (if any) and the journal entries written after it"""
+        snapshot = None
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+        last_seq = snapshot['seq'] if snapshot else 0
+        tail = [entry for entry in self.read_entries(self.path) if entry['seq'] > last_seq]
+        return snapshot, tail
+
+    def replay_all(self):
+        """Every journaled fill from archived and current segments, oldest first"""
+        segments = sorted(self.path.parent.glob(f"{self.path.name}.*"), key=lambda p: int(p.suffix[1:]))
+        for segment in segments + [self.path]:
+            for entry in self.read_entries(segment):
+                yield entry
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.repair(self.path)
+        self.file = open(self.path, 'a')
+        self.thread = threading.Thread(target=self.run, name='trade-journal', daemon=True)
+        self.thread.start()
+
+    def append(self, entries: List[Dict]):
+        """Queue journal entries; never blocks on disk I/O"""
+        for entry in entries:
+            self.queue.put(('entry', entry))
+
+    def snapshot(self, state: Dict):
+        """Queue a snapshot; it is written after every entry queued before it"""
+        self.queue.put(('snapshot', state))
+
+    def close(self, timeout: float = 10.0):
+        if self.thread and self.thread.is_alive():
+            self.queue.put(('stop', None))
+            self.thread.join(timeout)
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            pending = []
+            for kind, payload in batch:
+                if kind == 'entry':
+                    pending.append(json.dumps(payload))
+                    continue
+                self.write_entries(pending)
+                pending = []
+                if kind == 'snapshot':
+                    self.write_snapshot(payload)
+                else:
+                    running = False
+            self.write_entries(pending)
+        self.file.close()
+
+    def write_entries(self, lines: List[str]):
+        if not lines:
+            return
+        try:
+            self.file.write('\n'.join(lines) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError as e:
+            logging.error(f"Error writing trade journal: {e}")
+
+    def write_snapshot(self, state: Dict):
+        try:
+            temp_path = self.snapshot_path.with_suffix('.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            # Everything in the current segment is now covered by the snapshot
+            self.file.close()
+            if self.path.exists() and self.path.stat().st_size:
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.{state['seq']}"))
+            self.file = open(self.path, 'a')
+            logging.info(f"Wrote paper trader snapshot at journal entry {state['seq']}")
+        except OSError as e:
+            logging.error(f"Error writing paper trader snapshot: {e}")
+            if self.file.closed:
+                self.file = open(self.path, 'a')
+
+class MarketSnapshot:
+    """Scanner results and position prices published by the refresh worker.
+
+    updated_at is when the oldest API response behind the data was fetched,
+    which can be earlier than the refresh that published it when the search
+    cache answered.
+    """
+    def __init__(self, version: int = 0, updated_at: Optional[float] = None,
+                 tokens: Optional[TokenBatch] = None, prices: Optional[Dict[str, TokenRow]] = None,
+                 error: Optional[str] = None):
+        self.version = version
+        self.updated_at = updated_at
+        self.tokens = tokens if tokens is not None else TokenBatch.from_pairs([])
+        self.prices = prices or {}
+        self.error = error
+
+    def age(self) -> Optional[float]:
+        if self.updated_at is None:
+            return None
+        return time.time() - self.updated_at
+
+class BackgroundPoller:
+    """Refreshes market data off the UI thread and publishes versioned snapshots"""
+    def __init__(self, monitor, trader, interval: float = 15.0, lookup_timeout: float = 10.0):
+        self.monitor = monitor
+        self.trader = trader
+        self.interval = interval
+        self.lookup_timeout = lookup_timeout
+        # One-off price lookups run beside the refresh loop so they do not wait for a scan
+        self.lookup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='price-lookup')
+        self.snapshot = MarketSnapshot()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.refresh_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='market-poller', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self.stop_event.set()
+        self.refresh_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def request_refresh(self):
+        """Ask the worker to refresh now instead of waiting for the next interval"""
+        self.refresh_event.set()
+
+    def lookup(self, token_address: str) -> Future:
+        """Fetch a token's most liquid pair in the background; the future resolves to the pair or None"""
+        deadline = time.monotonic() + self.lookup_timeout
+        return self.lookup_executor.submit(
+            lambda: self.monitor.fetch_token_pairs([(None, token_address)], deadline=deadline).get(token_address))
+
+    def get_snapshot(self) -> MarketSnapshot:
+        with self.lock:
+            return self.snapshot
+
+    def publish(self, tokens: TokenBatch, prices: Dict[str, TokenRow], error: Optional[str] = None,
+                updated_at: Optional[float] = None):
+        with self.lock:
+            previous = self.snapshot
+            updated_at = time.time() if updated_at is None else updated_at
+            self.snapshot = MarketSnapshot(previous.version + 1, updated_at, tokens, prices, error)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.refresh_event.clear()
+            try:
+                with METRICS.timer('poller_refresh_seconds'):
+                    self.refresh()
+            except Exception as e:
+                METRICS.inc('poller_errors_total')
+                logging.error(f"Error refreshing market data: {e}")
+                previous = self.get_snapshot()
+                self.publish(previous.tokens, previous.prices, str(e), previous.updated_at)
+            self.refresh_event.wait(self.interval)
+
+    def refresh(self):
+        tokens = self.monitor.scan_new_tokens()
+        with METRICS.timer('pattern_analysis_seconds'):
+            tokens.pattern, tokens.decision = self.trader.pattern_analyzer.evaluate_many(tokens.pair_address.tolist())
+        self.monitor.evaluate_alerts(tokens)
+
+        pairs = self.monitor.fetch_token_pairs([(None, address) for address in list(self.trader.positions)])
+        held = TokenBatch.from_pairs(list(pairs.values()))
+        fetched_at = self.monitor.fetch_times(list(pairs.values()))
+        self.monitor.record_batch(held, fetched_at)
+        # Report the age of the data itself; cached responses can be older than this refresh
+        oldest = [self.monitor.last_scan_fetched_at] if self.monitor.last_scan_fetched_at is not None else []
+        self.publish(tokens, dict(zip(pairs, held)), updated_at=min(oldest + fetched_at.tolist(), default=None))
+
+class ListView:
+    """Scrollable list drawn through a curses pad, formatting only rows near the viewport.
+
+    The pad holds the visible rows plus up to one screen above and below, so
+    short scrolls only move the pad's viewport. Rows are formatted again when
+    the data version changes, the width changes or the viewport leaves the
+    formatted range.
+    """
+    def __init__(self, format_row):
+        self.format_row = format_row
+        self.count = 0
+        self.version = None
+        self.offset = 0
+        self.rows = 1
+        self.pad = None
+        self.pad_start = 0
+        self.pad_end = 0
+        self.pad_size = (0, 0)
+
+    def set_data(self, count: int, version, rows: int):
+        """Called while drawing a frame; a new version invalidates the formatted rows"""
+        if version != self.version:
+            self.version = version
+            self.pad_end = -1
+        self.count = count
+        self.rows = max(1, rows)
+        self.scroll(0)
+
+    def scroll(self, delta: int):
+        self.offset = max(0, min(self.offset + delta, self.count - self.rows))
+
+    def position_text(self) -> str:
+        last = min(self.count, self.offset + self.rows)
+        return f"Rows {self.offset + 1}-{last} of {self.count}  [Up/Down j/k PgUp/PgDn Home/End]"
+
+    def render(self, renderer: 'Renderer', top: int, left: int, width: int):
+        width = max(2, width - left)
+        if (self.pad is None or self.offset < self.pad_start or self.offset + self.rows > self.pad_end
+                or self.pad_size[1] != width):
+            self.pad_start = max(0, self.offset - self.rows)
+            self.pad_end = min(self.count, self.offset + 2 * self.rows)
+            # At least a screenful, so rows past the end of a short list are blanked
+            size = (max(self.pad_end - self.pad_start, self.rows), width)
+            if self.pad is None or size != self.pad_size:
+                self.pad = renderer.new_pad(*size)
+                self.pad_size = size
+            else:
+                self.pad.erase()
+            for index in range(self.pad_start, self.pad_end):
+                text, attr = self.format_row(index)
+                try:
+                    self.pad.addstr(index - self.pad_start, 0, text[:width - 1], attr)
+                except curses.error:
+                    pass
+            METRICS.inc('ui_rows_formatted_total', self.pad_end - self.pad_start)
+        self.pad.noutrefresh(self.offset - self.pad_start, 0, top, left, top + self.rows - 1, left + width - 1)
+
+class LineCanvas:
+    """A frame under construction: the text segments each screen line should show"""
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.lines = {}
+        self.views = []
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def addstr(self, y: int, x: int, text: str, attr: int = 0):
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            return
+        # Writing the bottom-right cell makes curses raise, so stop one short on the last line
+        limit = self.width - x - (1 if y == self.height - 1 else 0)
+        if limit > 0:
+            self.lines.setdefault(y, []).append((x, text[:limit], attr))
+
+    def add_view(self, view: ListView, top: int):
+        """Show a list view from this row down, for the view's current number of rows"""
+        self.views.append((view, top))
+
+class Renderer:
+    """Differential curses renderer.
+
+    Each frame is drawn into a LineCanvas; only lines whose segments differ
+    from the previous frame are rewritten on the screen, list views are
+    copied from their pads, and the terminal is updated once per frame with
+    doupdate.
+    """
+    def __init__(self, screen, new_pad=None, doupdate=None):
+        self.screen = screen
+        self.new_pad = new_pad or curses.newpad
+        self.doupdate = doupdate or curses.doupdate
+        self.lines = {}
+        self.view_rows = set()
+
+    def invalidate(self):
+        """Forget the previous frame and repaint everything on the next one, e.g. after a resize"""
+        self.lines = {}
+        self.view_rows = set()
+        self.screen.clear()
+
+    def render(self, draw) -> int:
+        """Draw a frame with draw(canvas); returns the number of screen lines rewritten"""
+        height, width = self.screen.getmaxyx()
+        canvas = LineCanvas(height, width)
+        draw(canvas)
+        view_rows = set()
+        for view, top in canvas.views:
+            view_rows.update(range(top, min(height, top + view.rows)))
+
+        written = 0
+        for y in range(height):
+            segments = canvas.lines.get(y)
+            # Rows a list view covered last frame must be repainted even if the canvas left them blank
+            if segments == self.lines.get(y) and (y not in self.view_rows or y in view_rows):
+                continue
+            self.screen.move(y, 0)
+            self.screen.clrtoeol()
+            for x, text, attr in segments or ():
+                try:
+                    self.screen.addstr(y, x, text, attr)
+                except curses.error:
+                    pass
+            self.screen.touchline(y, 1)
+            written += 1
+        self.lines = canvas.lines
+        self.view_rows = view_rows
+
+        self.screen.noutrefresh()
+        for view, top in canvas.views:
+            view.render(self, top, 0, width)
+        self.doupdate()
+        METRICS.inc('ui_lines_written_total', written)
+        return written
+
 class PaperTraderUI:
-    def __init__(self, initial_capital=10000):
+    # Upper bound on redraws per second, and how often an idle terminal checks for new data
+    max_fps = 20
+    idle_poll = 0.25
+
+    def __init__(self, initial_capital=10000, cost_basis: str = 'average',
+                 journal: Optional[TradeJournal] = None, color_pair: Optional[Callable[[int], int]] = None):
         self.capital = initial_capital
-        self.positions = {}
+        # Attribute for a color pair; replaceable so frames can be drawn without a terminal
+        self.color_pair = color_pair or curses.color_pair
+        self.ledger = PositionLedger(cost_basis)
         self.trade_history = []
+        self.journal = journal
+        self.journal_seq = 0
+        self.seq_at_snapshot = 0
         self.current_page = 'main'
         self.selected_token = None
         self.message = ""
         self.message_timeout = 0
         self.monitor = None
+        self.poller = None
         self.pattern_analyzer = PatternAnalyzer()
+        self.fill_engine = FillEngine()
+        self.trade_lock = threading.Lock()
         self.current_token_data = {}
+        self.pending_trade = None
+        self.scanner_tokens = TokenBatch.from_pairs([])
+        self.portfolio_rows = []
+        self.portfolio_prices = {}
+        # Held tokens a price refresh was already requested for; unresolved ones wait for the next interval
+        self.price_requested = set()
+        self.portfolio_view = ListView(self.format_portfolio_row)
+        self.scanner_view = ListView(self.format_scanner_row)
+        self.history_view = ListView(self.format_history_row)
+        self.alerts_rows = []
+        self.alerts_view = ListView(self.format_alert_row)
         # Input handling attributes
         self.input_mode = False
         self.current_input = ""
@@ -82,10 +1923,93 @@ class PaperTraderUI:
             'amount': '',
             'side': ''
         }
+        if journal:
+            self.restore(journal)
+
+    def restore(self, journal: TradeJournal):
+        """Load the latest snapshot, replay the journal tail and start journaling"""
+        start = time.perf_counter()
+        method = self.ledger.method
+        snapshot, tail = journal.load()
+        if snapshot:
+            self.capital = snapshot['capital']
+            self.ledger = PositionLedger.from_dict(snapshot['ledger'])
+            self.trade_history = [journal.decode_trade(trade) for trade in snapshot['recent_trades']]
+            self.journal_seq = self.seq_at_snapshot = snapshot['seq']
+        for entry in tail:
+            trade = journal.decode_trade(entry['trade'])
+            self.ledger.apply(trade)
+            self.trade_history.append(trade)
+            self.capital = entry['capital']
+            self.journal_seq = entry['seq']
+        journal.start()
+        if self.ledger.method != method:
+            # The snapshot's ledger was kept with the other method; derive positions again from the fills
+            logging.warning(f"Paper trader snapshot uses {self.ledger.method} cost basis, "
+                            f"rebuilding positions with {method}")
+            self.ledger = PositionLedger(method)
+            self.rebuild_ledger()
+            with self.trade_lock:
+                journal.snapshot(self.snapshot_state())
+                self.seq_at_snapshot = self.journal_seq
+        if snapshot or tail:
+            logging.info(f"Restored paper trader at journal entry {self.journal_seq} "
+                         f"({len(tail)} replayed) in {time.perf_counter() - start:.3f}s")
+
+    def snapshot_state(self) -> Dict:
+        """Compacted state as of the last journaled fill; call with trade_lock held"""
+        tail = self.journal.history_tail if self.journal else 0
+        return {
+            'seq': self.journal_seq,
+            'capital': self.capital,
+            'ledger': self.ledger.to_dict(),
+            'recent_trades': [TradeJournal.encode_trade(trade) for trade in self.trade_history[-tail:]] if tail else [],
+            'saved_at': datetime.now().isoformat()
+        }
+
+    def shutdown(self):
+        """Write a final snapshot and flush the journal"""
+        if self.journal:
+            with self.trade_lock:
+                if self.journal_seq > self.seq_at_snapshot:
+                    self.journal.snapshot(self.snapshot_state())
+            self.journal.close()
+
+    @property
+    def positions(self) -> Dict[str, float]:
+        """Open quantity per token, owned by the ledger"""
+        return self.ledger.quantities
+
+    def rebuild_ledger(self):
+        """Recompute positions and P&L from the full journaled trade log (or the in-memory history)"""
+        with self.trade_lock:
+            if self.journal:
+                trades = [TradeJournal.decode_trade(entry['trade']) for entry in self.journal.replay_all()]
+            else:
+                trades = self.trade_history
+            self.ledger.rebuild(trades)
 
     def set_monitor(self, monitor):
         """Set reference to MemecoinMonitor instance"""
         self.monitor = monitor
+        self.pattern_analyzer = monitor.pattern_analyzer
+        self.poller = BackgroundPoller(monitor, self)
+
+    def get_snapshot(self) -> MarketSnapshot:
+        """Latest market data; rendering never touches the network"""
+        if self.poller:
+            return self.poller.get_snapshot()
+        return MarketSnapshot()
+
+    def format_staleness(self) -> str:
+        snapshot = self.get_snapshot()
+        age = snapshot.age()
+        if age is None:
+            return "Waiting for first market data refresh..."
+        status = f"Data v{snapshot.version} updated {age:.0f}s ago"
+        if snapshot.error:
+            status += f" (last refresh failed: {snapshot.error[:40]})"
+        return status
 
     def display_main_menu(self, stdscr, height, width):
         """Display main menu screen"""
@@ -108,7 +2032,9 @@ class PaperTraderUI:
         stdscr.addstr(14, 4, "[t] Trade")
         stdscr.addstr(15, 4, "[h] History")
         stdscr.addstr(16, 4, "[s] Scanner")
-        stdscr.addstr(17, 4, "[q] Quit")
+        stdscr.addstr(17, 4, "[a] Alerts")
+        stdscr.addstr(18, 4, "[x] Stats")
+        stdscr.addstr(19, 4, "[q] Quit")
 
     def display_portfolio(self, stdscr, height, width):
         """Display portfolio screen"""
@@ -117,46 +2043,35 @@ class PaperTraderUI:
             stdscr.addstr(5, 2, "No positions open")
             return
             
-        headers = ["Token", "Amount", "Avg Price", "Current Price", "P&L"]
+        headers = ["Token", "Amount", "Avg Price", "Current Price", "Unrealized P&L", "Realized P&L"]
         stdscr.addstr(5, 2, " | ".join(headers))
         
-        row = 7
-        for token, amount in self.positions.items():
-            if self.update_token_data(token):
-                current_price = float(self.current_token_data['price_usd'])
-                trades = [t for t in self.trade_history if t['token_address'] == token]
-                avg_price = sum(t['price'] * t['amount'] for t in trades) / sum(t['amount'] for t in trades)
-                pnl = (current_price - avg_price) * amount
-                
-                position_str = (f"{token[:10]} | {amount:.4f} | ${avg_price:.8f} | "
-                              f"${current_price:.8f} | ${pnl:.2f}")
-                color = curses.color_pair(1) if pnl >= 0 else curses.color_pair(2)
-                stdscr.addstr(row, 2, position_str, color)
-                row += 1
-
-        def display_trade_screen(self, stdscr, height, width):
-         """Display trading screen with input handling"""
-        stdscr.addstr(3, 0, "=== Execute Trade ===", curses.A_BOLD)
-        
-        # Show current token info if selected
-        if self.selected_token and self.current_token_data:
-            stdscr.addstr(5, 2, f"Selected Token: {self.current_token_data['token_symbol']}")
-            stdscr.addstr(6, 2, f"Current Price: ${float(self.current_token_data['price_usd']):.8f}")
-            stdscr.addstr(7, 2, f"24h Change: {self.current_token_data['price_change_24h']}%")
-            stdscr.addstr(8, 2, f"Pattern: {self.current_token_data.get('pattern', 'Unknown')}")
-        
-        # Trade input form
-        start_row = 10
-        stdscr.addstr(start_row, 2, "Token address: " + self.trade_input_state['token_address'])
-        stdscr.addstr(start_row + 1, 2, "Amount: " + self.trade_input_state['amount'])
-        stdscr.addstr(start_row + 2, 2, "Side (buy/sell): " + self.trade_input_state['side'])
-        
-        # Show input instructions
-        stdscr.addstr(start_row + 4, 2, "Press: [1] Enter token [2] Enter amount [3] Enter side [Enter] Execute trade")
-        
-        # Show current input if in input mode
-        if self.input_mode:
-            stdscr.addstr(height-3, 0, f"{self.input_prompt}: {self.current_input}")
+        snapshot = self.get_snapshot()
+        self.portfolio_prices = snapshot.prices
+        self.portfolio_rows = list(self.positions.items())
+        missing = {token for token, _ in self.portfolio_rows if token not in snapshot.prices} - self.price_requested
+        if self.poller and missing:
+            self.price_requested |= missing
+            self.poller.request_refresh()
+        # Rows change with new prices and with every fill
+        self.portfolio_view.set_data(len(self.portfolio_rows), (snapshot.version, len(self.trade_history)),
+                                     height - 10)
+        stdscr.addstr(6, 2, self.portfolio_view.position_text())
+        stdscr.add_view(self.portfolio_view, 7)
+
+    def format_portfolio_row(self, index: int) -> Tuple[str, int]:
+        token, amount = self.portfolio_rows[index]
+        token_data = self.portfolio_prices.get(token)
+        if token_data is None:
+            return f"{token[:10]} | {amount:.4f} | awaiting price update...", 0
+        if not token_data.get('price_usd'):
+            return f"{token[:10]} | {amount:.4f} | price unavailable", 0
+        current_price = float(token_data['price_usd'])
+        avg_price = self.ledger.average_cost(token)
+        pnl = self.ledger.unrealized_pnl(token, current_price)
+        position_str = (f"{token[:10]} | {amount:.4f} | ${avg_price:.8f} | "
+                      f"${current_price:.8f} | ${pnl:.2f} | ${self.ledger.realized_pnl(token):.2f}")
+        return position_str, self.color_pair(1) if pnl >= 0 else self.color_pair(2)
 
     def display_trade_history(self, stdscr, height, width):
         """Display trade history screen"""
@@ -167,48 +2082,112 @@ class PaperTraderUI:
             
         headers = ["Time", "Token", "Side", "Amount", "Price", "Slippage"]
         stdscr.addstr(5, 2, " | ".join(headers))
-        
-        for i, trade in enumerate(reversed(self.trade_history[-10:]), start=7):
-            row = (f"{trade['timestamp'].strftime('%H:%M:%S')} | "
-                  f"{trade['token_address'][:8]} | "
-                  f"{trade['side'].upper()} | "
-                  f"{trade['amount']:.4f} | "
-                  f"${trade['price']:.8f} | "
-                  f"{(trade['slippage']/trade['price'])*100:.2f}%")
-            color = curses.color_pair(1) if trade['side'] == 'buy' else curses.color_pair(2)
-            stdscr.addstr(i, 2, row, color)
+        # History is append-only, so its length versions the formatted rows
+        self.history_view.set_data(len(self.trade_history), len(self.trade_history), height - 10)
+        stdscr.addstr(6, 2, self.history_view.position_text())
+        stdscr.add_view(self.history_view, 7)
+
+    def format_history_row(self, index: int) -> Tuple[str, int]:
+        """Newest trade first"""
+        trade = self.trade_history[-1 - index]
+        row = (f"{trade['timestamp'].strftime('%H:%M:%S')} | "
+              f"{trade['token_address'][:8]} | "
+              f"{trade['side'].upper()} | "
+              f"{trade['amount']:.4f} | "
+              f"${trade['price']:.8f} | "
+              f"{(trade['slippage']/trade['price'])*100:.2f}%")
+        return row, self.color_pair(1) if trade['side'] == 'buy' else self.color_pair(2)
+
+    def display_alerts(self, stdscr, height, width):
+        """Display the most recent alert rule firings"""
+        stdscr.addstr(3, 0, "=== Alerts ===", curses.A_BOLD)
+        engine = self.monitor.alert_engine if self.monitor else None
+        if engine is None or not engine.rules:
+            stdscr.addstr(5, 2, f"No alert rules loaded (see {ALERT_RULES_FILE})")
+            return
+        stdscr.addstr(4, 2, f"{len(engine.rules)} rules | {engine.fired} fired | {engine.suppressed} suppressed")
+        if not engine.recent:
+            stdscr.addstr(5, 2, "No alerts fired yet")
+            return
+
+        stdscr.addstr(5, 2, " | ".join(["Time", "Rule", "Token", "Chain", "Price"]))
+        # Firings only ever grow, so the running total versions the formatted rows
+        with engine.lock:
+            self.alerts_rows = list(engine.recent)
+        self.alerts_view.set_data(len(self.alerts_rows), engine.fired, height - 10)
+        stdscr.addstr(6, 2, self.alerts_view.position_text())
+        stdscr.add_view(self.alerts_view, 7)
+
+    def format_alert_row(self, index: int) -> Tuple[str, int]:
+        """Newest alert first"""
+        alert = self.alerts_rows[-1 - index]
+        row = (f"{datetime.fromtimestamp(alert['fired_at']).strftime('%H:%M:%S')} | {alert['name'][:20]} | "
+               f"{str(alert['token_symbol'])[:10]} | {alert['chain']} | ${alert['price_usd']:.8f}")
+        return row, self.color_pair(3)
 
     def display_scanner(self, stdscr, height, width):
         """Display token scanner screen"""
         stdscr.addstr(3, 0, "=== Token Scanner ===", curses.A_BOLD)
         if self.monitor:
-            tokens = self.monitor.scan_new_tokens()
+            snapshot = self.get_snapshot()
+            tokens = snapshot.tokens
             if tokens:
-                headers = ["Token", "Price", "24h Change", "Pattern"]
+                headers = ["Token", "Price", "24h Change", "RSI", "Pattern"]
                 stdscr.addstr(5, 2, " | ".join(headers))
-                for i, token in enumerate(tokens[:10], start=7):
-                    volume_data = pd.Series([float(token['volume_24h']) * (1 + 0.1 * i) for i in range(5)])
-                    pattern = self.pattern_analyzer.analyze(volume_data)
-                    row = f"{token['token_symbol'][:10]} | ${float(token['price_usd']):.8f} | {token['price_change_24h']}% | {pattern}"
-                    color = curses.color_pair(1) if float(token['price_change_24h']) >= 0 else curses.color_pair(2)
-                    stdscr.addstr(i, 2, row, color)
+                self.scanner_tokens = tokens
+                self.scanner_view.set_data(len(tokens), snapshot.version, height - 10)
+                stdscr.addstr(6, 2, self.scanner_view.position_text())
+                stdscr.add_view(self.scanner_view, 7)
+            elif snapshot.updated_at is None:
+                stdscr.addstr(5, 2, "Scanning...")
             else:
                 stdscr.addstr(5, 2, "No tokens found")
 
-    def update_token_data(self, token_address: str) -> bool:
-        """Update current token data from API"""
-        if self.monitor:
-            results = self.monitor.search_dexscreener(token_address)
-            if results and 'pairs' in results and results['pairs']:
-                pair = results['pairs'][0]
-                self.current_token_data = self.monitor.get_token_info(pair)
-                volume_data = pd.Series([float(pair['volume']['h24']) for _ in range(5)])
-                pattern = self.pattern_analyzer.analyze(volume_data)
-                self.current_token_data['pattern'] = pattern
-                return True
-        return False
+    def display_stats(self, stdscr, height, width):
+        """Display instrumentation timers and counters"""
+        stdscr.addstr(3, 0, "=== Stats ===", curses.A_BOLD)
+        if not METRICS.enabled:
+            stdscr.addstr(5, 2, "Metrics are disabled; start with --metrics to collect them")
+            return
+        timings, counts = METRICS.summary()
+        row = 5
+        stdscr.addstr(row, 2, f"{'Timer':<40} {'Count':>8} {'Mean ms':>9} {'p95 ms':>9} {'Max ms':>9} {'Total s':>9}"[:width - 3])
+        row += 1
+        for timing in timings:
+            if row >= height - 4:
+                break
+            name = f"{timing['name']}{{{timing['labels']}}}" if timing['labels'] else timing['name']
+            line = (f"{name[:40]:<40} {timing['count']:>8} {timing['mean'] * 1000:>9.2f} "
+                    f"{timing['p95'] * 1000:>9.1f} {timing['max'] * 1000:>9.1f} {timing['total']:>9.2f}")
+            stdscr.addstr(row, 2, line[:width - 3])
+            row += 1
+        row += 1
+        for count in counts:
+            if row >= height - 4:
+                break
+            name = f"{count['name']}{{{count['labels']}}}" if count['labels'] else count['name']
+            stdscr.addstr(row, 2, f"{name[:60]:<60} {count['value']:>12g}"[:width - 3])
+            row += 1
 
+    def format_scanner_row(self, index: int) -> Tuple[str, int]:
+        """One scanner row, read straight from the snapshot's columns"""
+        tokens = self.scanner_tokens
+        rsi = tokens.rsi.item(index)
+        change = tokens.price_change_24h.item(index)
+        row = (f"{str(tokens.token_symbol.item(index))[:10]} | ${tokens.price_usd.item(index):.8f} | {change}% | "
+               f"{'--' if np.isnan(rsi) else f'{rsi:.0f}'} | {tokens.pattern.item(index) or 'Unknown'}")
+        return row, self.color_pair(1) if change >= 0 else self.color_pair(2)
 
+    def active_view(self) -> Optional[ListView]:
+        if self.current_page == 'portfolio':
+            return self.portfolio_view
+        if self.current_page == 'scanner':
+            return self.scanner_view
+        if self.current_page == 'history':
+            return self.history_view
+        if self.current_page == 'alerts':
+            return self.alerts_view
+        return None
 
     def get_user_input(self, stdscr, prompt: str, callback):
         """Start input mode with a prompt and callback"""
@@ -275,6 +2254,99 @@ class PaperTraderUI:
             elif key == 10:  # Enter key
                 self.execute_trade_from_input()
 
+    def set_message(self, message: str, duration: float = 5.0):
+        """Show a status message in the footer for a few seconds"""
+        self.message = message
+        self.message_timeout = time.time() + duration
+
+    def execute_orders(self, orders: List[Dict]) -> List[Dict]:
+        """Fill a batch of orders against constant-product pools in one vectorized pass.
+
+        Each order needs token_address, side, amount and price (the pair's mid
+        price); liquidity_usd and pair_address make the fill AMM-aware. Sells
+        are capped at the position held before the batch and buys are accepted
+        in order until cash runs out. Returns the trades that were executed.
+        """
+        if not orders:
+            return []
+        tokens = np.array([order['token_address'] for order in orders], dtype=object)
+        pools = np.array([order.get('pair_address') or order['token_address'] for order in orders], dtype=object)
+        is_buy = np.array([order['side'] == 'buy' for order in orders])
+        is_side = is_buy | np.array([order['side'] == 'sell' for order in orders])
+        amounts = np.array([order['amount'] for order in orders], dtype=float)
+        prices = np.array([order['price'] for order in orders], dtype=float)
+        liquidities = np.array([np.nan if order.get('liquidity_usd') is None else order['liquidity_usd']
+                                for order in orders], dtype=float)
+
+        with self.trade_lock:
+            # Cap each sell at what is left of the position after earlier sells in the batch
+            held = np.array([self.positions.get(token, 0.0) for token in tokens])
+            sells = pd.Series(np.where(is_buy, 0.0, amounts))
+            sold_before = sells.groupby(pd.factorize(tokens)[0]).cumsum().to_numpy() - sells.to_numpy()
+            quantities = np.where(is_buy, amounts, -np.clip(held - sold_before, 0.0, amounts))
+            active = is_side & (amounts > 0) & (prices > 0) & (np.abs(quantities) > 0)
+
+            quote, fillable = self.fill_engine.fill(pools[active], quantities[active], prices[active],
+                                                    liquidities[active])
+            accepted = np.zeros(len(orders), dtype=bool)
+            spent = np.cumsum(np.where(fillable & (quote > 0), quote, 0.0))
+            accepted[active] = fillable & ((quote <= 0) | (spent <= self.capital))
+            # Rejected orders no longer move the pools; price the accepted ones again
+            quote, _ = self.fill_engine.fill(pools[accepted], quantities[accepted], prices[accepted],
+                                             liquidities[accepted])
+
+            now = datetime.now()
+            fills = []
+            journal_entries = []
+            for index, paid in zip(np.flatnonzero(accepted), quote.tolist()):
+                token, quantity, mid_price = tokens[index], float(quantities[index]), float(prices[index])
+                executed_price = abs(paid) / abs(quantity)
+                self.capital -= paid
+                self.journal_seq += 1
+                fills.append({
+                    'timestamp': now,
+                    'token_address': token,
+                    'side': 'buy' if quantity > 0 else 'sell',
+                    'amount': abs(quantity),
+                    'price': executed_price,
+                    'mid_price': mid_price,
+                    'slippage': abs(executed_price - mid_price),
+                    'value': abs(paid)
+                })
+                journal_entries.append((self.journal_seq, self.capital, fills[-1]))
+            for trade in fills:
+                self.ledger.apply(trade)
+            self.trade_history.extend(fills)
+            if self.journal and fills:
+                self.journal.append([{'seq': seq, 'capital': capital, 'trade': TradeJournal.encode_trade(trade)}
+                                     for seq, capital, trade in journal_entries])
+                if self.journal_seq - self.seq_at_snapshot >= self.journal.snapshot_every:
+                    self.journal.snapshot(self.snapshot_state())
+                    self.seq_at_snapshot = self.journal_seq
+
+        rejected = len(orders) - len(fills)
+        if rejected:
+            logging.info(f"Executed {len(fills)} of {len(orders)} orders; {rejected} lacked cash, position or liquidity")
+        return fills
+
+    def execute_trade(self, token_address: str, price: float, amount: float, side: str = 'buy',
+                      liquidity_usd: Optional[float] = None, pair_address: Optional[str] = None) -> Optional[Dict]:
+        """Execute a single paper trade and report the result in the footer"""
+        if side not in ('buy', 'sell'):
+            self.set_message("Error: Side must be buy or sell")
+            return None
+        fills = self.execute_orders([{
+            'token_address': token_address, 'side': side, 'amount': amount, 'price': price,
+            'liquidity_usd': liquidity_usd, 'pair_address': pair_address
+        }])
+        if not fills:
+            self.set_message(f"Error: Could not {side} {amount} {token_address[:10]}")
+            return None
+        trade = fills[0]
+        self.set_message(f"{side.upper()} {trade['amount']:.4f} {token_address[:10]} @ ${trade['price']:.8f} "
+                         f"(slippage {trade['slippage'] / trade['price'] * 100:.2f}%)")
+        return trade
+
     def execute_trade_from_input(self):
         """Execute trade based on input state"""
         try:
@@ -284,14 +2356,17 @@ class PaperTraderUI:
                 side = self.trade_input_state['side'].lower()
                 
                 if self.monitor:
-                    api_data = self.monitor.search_dexscreener(token)
-                    if api_data and 'pairs' in api_data and api_data['pairs']:
-                        price = float(api_data['pairs'][0]['priceUsd'])
-                        self.execute_trade(token, price, amount, side)
-                        # Clear input state after successful trade
-                        self.trade_input_state = {'token_address': '', 'amount': '', 'side': ''}
+                    # Prefer the poller's price; tokens it is not tracking are looked up in the
+                    # background and filled by complete_pending_trade once the price arrives
+                    token_data = self.get_snapshot().prices.get(token)
+                    if token_data:
+                        self.fill_from_input(token, amount, side, token_data)
+                    elif self.pending_trade:
+                        self.set_message("Still fetching the price for the previous trade")
                     else:
-                        self.set_message("Error: Could not fetch token price")
+                        self.pending_trade = {'future': self.poller.lookup(token), 'token_address': token,
+                                              'amount': amount, 'side': side}
+                        self.set_message(f"Fetching price for {token[:10]}...", self.poller.lookup_timeout)
                 else:
                     self.set_message("Error: Monitor not initialized")
         except ValueError:
@@ -299,6 +2374,31 @@ class PaperTraderUI:
         except Exception as e:
             self.set_message(f"Error executing trade: {str(e)}")
 
+    def complete_pending_trade(self):
+        """Fill the trade that was waiting for a background price lookup, once the lookup is done"""
+        pending = self.pending_trade
+        if not pending or not pending['future'].done():
+            return
+        self.pending_trade = None
+        try:
+            pair = pending['future'].result()
+            token_data = self.monitor.get_token_info(pair) if pair else None
+            self.fill_from_input(pending['token_address'], pending['amount'], pending['side'], token_data)
+        except Exception as e:
+            self.set_message(f"Error executing trade: {str(e)}")
+
+    def fill_from_input(self, token: str, amount: float, side: str, token_data):
+        """Execute a trade entered on the trade screen at a token's current price"""
+        if token_data and token_data.get('price_usd'):
+            liquidity = token_data.get('liquidity_usd')
+            if self.execute_trade(token, float(token_data['price_usd']), amount, side,
+                                  liquidity_usd=float(liquidity) if liquidity else None,
+                                  pair_address=token_data.get('pair_address')):
+                # Clear input state after successful trade
+                self.trade_input_state = {'token_address': '', 'amount': '', 'side': ''}
+        else:
+            self.set_message("Error: Could not fetch token price")
+
     def handle_input(self, key):
         """Handle user input"""
         if self.input_mode:
@@ -315,10 +2415,59 @@ class PaperTraderUI:
             self.current_page = 'history'
         elif key == ord('s'):
             self.current_page = 'scanner'
+        elif key == ord('a'):
+            self.current_page = 'alerts'
+        elif key == ord('x'):
+            self.current_page = 'stats'
+
+        view = self.active_view()
+        if view is not None:
+            if key in (curses.KEY_DOWN, ord('j')):
+                view.scroll(1)
+            elif key in (curses.KEY_UP, ord('k')):
+                view.scroll(-1)
+            elif key == curses.KEY_NPAGE:
+                view.scroll(view.rows)
+            elif key == curses.KEY_PPAGE:
+                view.scroll(-view.rows)
+            elif key == curses.KEY_HOME:
+                view.scroll(-view.count)
+            elif key == curses.KEY_END:
+                view.scroll(view.count)
         
         # Handle trade-specific inputs
         self.handle_trade_input(key)
 
+    def draw(self, stdscr):
+        """Draw the header, the current page and the footer onto a LineCanvas"""
+        height, width = stdscr.getmaxyx()
+
+        # Header
+        stdscr.addstr(0, 0, "=== Memecoin Paper Trading Terminal ===", curses.A_BOLD)
+        stdscr.addstr(1, 0, f"Capital: ${self.capital:.2f}", self.color_pair(1))
+        stdscr.addstr(2, 0, self.format_staleness()[:width - 1], self.color_pair(3))
+
+        # Display current page content
+        if self.current_page == 'main':
+            self.display_main_menu(stdscr, height, width)
+        elif self.current_page == 'portfolio':
+            self.display_portfolio(stdscr, height, width)
+        elif self.current_page == 'trade':
+            self.display_trade_screen(stdscr, height, width)
+        elif self.current_page == 'history':
+            self.display_trade_history(stdscr, height, width)
+        elif self.current_page == 'scanner':
+            self.display_scanner(stdscr, height, width)
+        elif self.current_page == 'alerts':
+            self.display_alerts(stdscr, height, width)
+        elif self.current_page == 'stats':
+            self.display_stats(stdscr, height, width)
+
+        # Footer
+        if time.time() < self.message_timeout:
+            stdscr.addstr(height-2, 0, self.message, self.color_pair(3))
+        stdscr.addstr(height-1, 0, "Commands: [q]uit [m]ain [p]ortfolio [t]rade [h]istory [s]canner [a]lerts [x] stats")
+
     def run_ui(self, stdscr):
         """Main UI loop"""
         curses.start_color()
@@ -326,49 +2475,97 @@ class PaperTraderUI:
         curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
         curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
         curses.curs_set(1)  # Show cursor
-        stdscr.nodelay(0)   # Make getch() blocking
-        
+        renderer = Renderer(stdscr)
+        frame_interval = 1.0 / self.max_fps
+        if self.poller:
+            self.poller.start()
+
+        dirty = True
+        last_frame = 0.0
+        last_version = None
         while True:
-            stdscr.clear()
-            height, width = stdscr.getmaxyx()
-            
-            # Header
-            stdscr.addstr(0, 0, "=== Memecoin Paper Trading Terminal ===", curses.A_BOLD)
-            stdscr.addstr(1, 0, f"Capital: ${self.capital:.2f}", curses.color_pair(1))
-            
-            # Display current page content
-            if self.current_page == 'main':
-                self.display_main_menu(stdscr, height, width)
-            elif self.current_page == 'portfolio':
-                self.display_portfolio(stdscr, height, width)
-            elif self.current_page == 'trade':
-                self.display_trade_screen(stdscr, height, width)
-            elif self.current_page == 'history':
-                self.display_trade_history(stdscr, height, width)
-            elif self.current_page == 'scanner':
-                self.display_scanner(stdscr, height, width)
-            
-            # Footer
-            if time.time() < self.message_timeout:
-                stdscr.addstr(height-2, 0, self.message, curses.color_pair(3))
-            stdscr.addstr(height-1, 0, "Commands: [q]uit [m]ain [p]ortfolio [t]rade [h]istory [s]canner")
-            
+            # Redraw after input, when the poller publishes, and once a second for the clocks,
+            # but never more often than max_fps
+            now = time.monotonic()
+            version = self.get_snapshot().version
+            if dirty or version != last_version or now - last_frame >= 1.0:
+                if now - last_frame >= frame_interval:
+                    with METRICS.timer('ui_redraw_seconds', page=self.current_page):
+                        renderer.render(self.draw)
+                    last_frame, last_version, dirty = now, version, False
+                else:
+                    dirty = True
+            wait = frame_interval if dirty else min(self.idle_poll, 1.0 - (time.monotonic() - last_frame))
+            stdscr.timeout(max(1, int(wait * 1000)))
+
             # Handle input
             key = stdscr.getch()
-            if key == ord('q'):
+            if self.pending_trade and self.pending_trade['future'].done():
+                self.complete_pending_trade()
+                dirty = True
+            if key == -1:
+                continue
+            if key == ord('q') and not self.input_mode:
                 break
-                
-            self.handle_input(key)
-            stdscr.refresh()
+            METRICS.inc('ui_keys_total')
+            if key == curses.KEY_RESIZE:
+                renderer.invalidate()
+            else:
+                self.handle_input(key)
+            dirty = True
+
+        if self.poller:
+            self.poller.stop()
 
 class MemecoinMonitor:
-    def __init__(self, watchlist_file: str = 'memecoin_watchlist.json'):
+    # Filtering criteria shared by analyze_token and the vectorized scan path
+    min_liquidity_usd = 10000
+    min_volume_24h = 5000
+    min_price_usd = 0.000001
+
+    def __init__(self, watchlist_file: str = 'memecoin_watchlist.json',
+                 max_workers: int = 8, requests_per_minute: int = 300,
+                 scan_deadline: float = 30.0, max_retries: int = 3,
+                 cache_ttl: float = 30.0, cache_size: int = 256,
+                 data_file: str = DATA_FILE, legacy_csv: str = LEGACY_DATA_FILE,
+                 journal_file: str = JOURNAL_FILE, snapshot_file: str = SNAPSHOT_FILE,
+                 rules_file: str = ALERT_RULES_FILE, cost_basis: str = 'average',
+                 color_pair: Optional[Callable[[int], int]] = None):
         self.watchlist_file = watchlist_file
         self.watchlist = self.load_watchlist()
+        # Hash set so blacklist checks stay O(1) as the list grows
+        self.blacklist = set(self.watchlist.get('blacklisted_tokens', []))
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
-        self.pattern_analyzer = PatternAnalyzer()
-        self.paper_trader = PaperTraderUI()
+        # Size the connection pool so concurrent searches reuse connections
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dexscreener')
+        # DexScreener allows 300 search requests per minute
+        self.rate_limiter = TokenBucket(rate=requests_per_minute / 60, capacity=max_workers)
+        self.scan_deadline = scan_deadline
+        self.max_retries = max_retries
+        # Search responses keyed on query, and the most liquid pair last seen per token address
+        self.search_cache = TTLCache(ttl=cache_ttl, max_size=cache_size)
+        self.pair_cache = TTLCache(ttl=cache_ttl, max_size=cache_size * 50)
+        self.token_chains = {}
+        self.last_scan_pairs = 0
+        self.last_scan_fetched_at = None
+        self.history = TimeSeriesStore()
+        self.indicators = StreamingIndicators()
+        self.alert_engine = AlertEngine(load_alert_rules(rules_file))
+        self.history.on_evict = self.forget_pair
+        self.pattern_analyzer = PatternAnalyzer(history=self.history)
+        self.snapshot_store = SnapshotStore(data_file)
+        if Path(legacy_csv).exists():
+            self.snapshot_store.import_csv(legacy_csv)
+        self.paper_trader = PaperTraderUI(cost_basis=cost_basis, journal=TradeJournal(journal_file, snapshot_file),
+                                          color_pair=color_pair)
+
+    def forget_pair(self, pair_address: str):
+        self.indicators.discard(pair_address)
+        self.alert_engine.discard(pair_address)
 
     def load_watchlist(self) -> Dict:
         try:
@@ -378,14 +2575,18 @@ class MemecoinMonitor:
         except Exception as e:
             logging.error(f"Error loading watchlist: {e}")
 
-        default_watchlist = {
+        default_watchlist = self.default_watchlist()
+        self.save_watchlist(default_watchlist)
+        return default_watchlist
+
+    @staticmethod
+    def default_watchlist() -> Dict:
+        return {
             "keywords": ["pepe", "wojak", "doge", "shib", "floki", "inu", "elon", "moon", "safe", "chad", "based", "wojak", "meme"],
             "trending_tokens": {},
             "blacklisted_tokens": [],
             "chains": ["ethereum", "bsc", "arbitrum", "polygon"]
         }
-        self.save_watchlist(default_watchlist)
-        return default_watchlist
 
     def save_watchlist(self, watchlist: Dict):
         try:
@@ -394,53 +2595,344 @@ class MemecoinMonitor:
         except Exception as e:
             logging.error(f"Error saving watchlist: {e}")
 
-    def search_dexscreener(self, query: str) -> Optional[Dict]:
+    def backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Jittered exponential backoff, honouring Retry-After when the API sends it"""
+        if retry_after:
+            try:
+                return float(retry_after) + random.uniform(0, 0.5)
+            except ValueError:
+                pass
+        return random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+
+    def request_json(self, url: str, description: str, deadline: Optional[float] = None,
+                     endpoint: str = 'search') -> Optional[Dict]:
+        """Rate-limited GET with retries on 429/5xx; gives up once the deadline passes."""
+        for attempt in range(self.max_retries + 1):
+            with METRICS.timer('rate_limit_wait_seconds', endpoint=endpoint):
+                acquired = self.rate_limiter.acquire(deadline)
+            if not acquired:
+                METRICS.inc('requests_abandoned_total', endpoint=endpoint, reason='deadline')
+                logging.warning(f"Deadline reached before requesting {description}")
+                return None
+            timeout = 10.0 if deadline is None else min(10.0, deadline - time.monotonic())
+            if timeout <= 0:
+                logging.warning(f"Deadline reached before requesting {description}")
+                return None
+            try:
+                with METRICS.timer('http_request_seconds', endpoint=endpoint):
+                    response = self.session.get(url, timeout=timeout)
+                METRICS.inc('http_responses_total', endpoint=endpoint, status=response.status_code)
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = self.backoff_delay(attempt, response.headers.get('Retry-After'))
+                    METRICS.inc('http_retries_total', endpoint=endpoint)
+                    logging.warning(f"DexScreener returned {response.status_code} for {description}, "
+                                    f"retrying in {delay:.2f}s")
+                else:
+                    response.raise_for_status()
+                    with METRICS.timer('json_parse_seconds', endpoint=endpoint):
+                        return response.json()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                METRICS.inc('http_errors_total', endpoint=endpoint, error=type(e).__name__)
+                if attempt == self.max_retries:
+                    logging.error(f"Error requesting {description}: {e}")
+                    return None
+                delay = self.backoff_delay(attempt)
+                logging.warning(f"Network error for {description}, retrying in {delay:.2f}s: {e}")
+            except Exception as e:
+                METRICS.inc('http_errors_total', endpoint=endpoint, error=type(e).__name__)
+                logging.error(f"Error requesting {description}: {e}")
+                return None
+            if deadline is not None and time.monotonic() + delay > deadline:
+                logging.warning(f"Deadline reached while retrying {description}")
+                return None
+            time.sleep(delay)
+        return None
+
+    def search_dexscreener(self, query: str, deadline: Optional[float] = None) -> Optional[Dict]:
         """Search DexScreener API for a given query."""
+        cached = self.search_cache.get(query)
+        if cached is not None:
+            METRICS.inc('search_cache_hits_total')
+            return cached
+        METRICS.inc('search_cache_misses_total')
         url = f"https://api.dexscreener.com/latest/dex/search?q={query}"
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logging.error(f"Error searching DexScreener for {query}: {e}")
-            return None
+        results = self.request_json(url, f"DexScreener search for {query}", deadline)
+        if results is not None:
+            self.stamp_fetch_time(results, results.get('pairs') or [])
+            self.search_cache.set(query, results)
+        return results
+
+    @staticmethod
+    def stamp_fetch_time(response, pairs: List[Dict]):
+        """Mark a freshly fetched response and its pairs with the current time (see FETCHED_AT)"""
+        fetched_at = time.time()
+        if isinstance(response, dict):
+            response[FETCHED_AT] = fetched_at
+        for pair in pairs:
+            if isinstance(pair, dict):
+                pair[FETCHED_AT] = fetched_at
+
+    @staticmethod
+    def fetch_times(pairs: List[Dict]) -> np.ndarray:
+        """When each pair's response was fetched; pairs without a stamp count as observed now"""
+        now = time.time()
+        return np.array([pair.get(FETCHED_AT, now) for pair in pairs], dtype=float)
 
-    def scan_new_tokens(self):
-        all_tokens = []
-        for keyword in self.watchlist['keywords']:
+    def search_keyword(self, keyword: str, deadline: Optional[float] = None) -> Optional[Dict]:
+        """search_dexscreener for a watchlist keyword, timed per keyword (cache hits included)"""
+        with METRICS.timer('keyword_search_seconds', keyword=keyword):
+            return self.search_dexscreener(keyword, deadline)
+
+    def fetch_token_pairs(self, tokens: List[Tuple[Optional[str], str]], use_cache: bool = True,
+                          deadline: Optional[float] = None) -> Dict[str, Dict]:
+        """Resolve (chain, address) pairs to each token's most liquid pair in bulk.
+
+        Addresses are grouped per chain and looked up 30 at a time; tokens whose
+        chain is unknown go through the chain-agnostic endpoint.
+        """
+        found = {}
+        by_chain = {}
+        for chain, address in tokens:
+            if not address or address in found:
+                continue
+            if use_cache:
+                pair = self.pair_cache.get(address)
+                if pair is not None:
+                    found[address] = pair
+                    continue
+            chain = chain or self.token_chains.get(address)
+            by_chain.setdefault(chain, {})[address.lower()] = address
+        if not by_chain:
+            return found
+
+        futures = []
+        for chain, addresses in by_chain.items():
+            requested = list(addresses.values())
+            for i in range(0, len(requested), BULK_TOKEN_LIMIT):
+                chunk = ','.join(requested[i:i + BULK_TOKEN_LIMIT])
+                if chain:
+                    url = f"https://api.dexscreener.com/tokens/v1/{chain}/{chunk}"
+                else:
+                    url = f"https://api.dexscreener.com/latest/dex/tokens/{chunk}"
+                futures.append(self.executor.submit(
+                    self.request_json, url, f"DexScreener token lookup on {chain or 'all chains'}", deadline,
+                    'tokens'))
+
+        fetched = {}
+        for future in futures:
+            data = future.result()
+            pairs = data if isinstance(data, list) else (data or {}).get('pairs') or []
+            self.stamp_fetch_time(data, pairs)
+            for pair in pairs:
+                base_address = (pair.get('baseToken', {}).get('address') or '').lower()
+                address = by_chain.get(pair.get('chainId'), {}).get(base_address) \
+                    or by_chain.get(None, {}).get(base_address)
+                if address and self.pair_liquidity(pair) >= self.pair_liquidity(fetched.get(address)):
+                    fetched[address] = pair
+        for address, pair in fetched.items():
+            self.pair_cache.set(address, pair)
+            self.token_chains[address] = pair.get('chainId')
+        found.update(fetched)
+        return found
+
+    def scan_new_tokens(self) -> TokenBatch:
+        # Keywords are searched concurrently; the token bucket keeps us within the API budget
+        keywords = list(dict.fromkeys(self.watchlist['keywords']))
+        start = time.monotonic()
+        deadline = start + self.scan_deadline
+        futures = {}
+        for keyword in keywords:
             logging.info(f"Searching for tokens with keyword: {keyword}")
-            results = self.search_dexscreener(keyword)
-            if not results or 'pairs' not in results:
+            futures[keyword] = self.executor.submit(self.search_keyword, keyword, deadline)
+        wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+
+        responses = []
+        for keyword, future in futures.items():
+            if not future.done():
+                future.cancel()
+                METRICS.inc('keyword_deadline_misses_total')
+                logging.warning(f"Search for {keyword} missed the scan deadline")
                 continue
+            results = future.result()
+            if results and 'pairs' in results:
+                responses.append(results)
+
+        self.last_scan_fetched_at = min((results.get(FETCHED_AT, time.time()) for results in responses), default=None)
+        unique_pairs = []
+        seen_pairs = set()
+        # Newest responses first, so a pair also found in an older cached response keeps its latest values
+        for results in sorted(responses, key=lambda results: results.get(FETCHED_AT, 0.0), reverse=True):
             for pair in results['pairs']:
-                token_info = self.get_token_info(pair)
-                if self.analyze_token(token_info):
-                    all_tokens.append(token_info)
-            time.sleep(1)
+                # Overlapping keywords return the same pairs; process each one once
+                pair_address = pair.get('pairAddress')
+                if pair_address in seen_pairs:
+                    continue
+                seen_pairs.add(pair_address)
+                unique_pairs.append(pair)
+
+        with METRICS.timer('scan_stage_seconds', stage='parse'):
+            batch = TokenBatch.from_pairs(unique_pairs)
+        # Remember the most liquid pair per token for later price lookups
+        best = np.nan_to_num(batch.liquidity_usd).argsort(kind='stable')
+        best_pairs = dict(zip(batch.token_address[best], best))
+        for token_address, index in best_pairs.items():
+            if token_address:
+                self.pair_cache.set(token_address, unique_pairs[index])
+        with METRICS.timer('scan_stage_seconds', stage='record'):
+            self.record_batch(batch, self.fetch_times(unique_pairs))
+        with METRICS.timer('scan_stage_seconds', stage='filter'):
+            all_tokens = batch.take(self.filter_tokens(batch))
+            all_tokens.rsi = self.indicators.rsi_many(all_tokens.pair_address)
+        elapsed = time.monotonic() - start
+        self.last_scan_pairs = len(seen_pairs)
+        METRICS.observe('scan_seconds', elapsed)
+        METRICS.inc('scan_pairs_total', len(seen_pairs))
+        METRICS.inc('scan_tokens_passed_total', len(all_tokens))
+        METRICS.set_gauge('tracked_pairs', len(self.history))
+        METRICS.set_gauge('search_cache_entries', self.search_cache.stats()['size'])
+        logging.info(f"Scanned {len(keywords)} keywords ({len(seen_pairs)} unique pairs) "
+                     f"in {elapsed:.2f}s, search cache {self.search_cache.stats()}")
         return all_tokens
 
-    def save_results(self, tokens: List[Dict], filename: str = 'memecoin_data.csv'):
-        if not tokens:
+    def record_batch(self, batch: TokenBatch, fetched_at: Optional[np.ndarray] = None):
+        """Append every observed pair in a scan to the history store.
+
+        fetched_at holds when each row's response was fetched (see fetch_times);
+        rows from a response that was already recorded are skipped by the store.
+        """
+        observed = batch.pair_address.astype(bool) & ~np.isnan(batch.price_usd)
+        if not observed.any():
             return
+        keys = batch.pair_address[observed]
+        prices, volumes = batch.price_usd[observed], batch.volume_24h[observed]
+        timestamps = time.time() if fetched_at is None else fetched_at[observed]
+        fresh = self.history.append_many(keys.tolist(), timestamps, prices, volumes, batch.liquidity_usd[observed])
+        self.indicators.update_many(keys[fresh], prices[fresh], volumes[fresh])
+        self.history.evict_idle()
 
-        results = []
-        for token in tokens:
-            volume_data = pd.Series([float(token['volume_24h']) * (1 + 0.1 * i) for i in range(5)])
-            token['pattern'] = self.pattern_analyzer.analyze(volume_data)
-            if self.pattern_analyzer.should_buy(volume_data):
-                token['decision'] = 'Buy'
-                self.paper_trader.execute_trade(token['token_address'], float(token['price_usd']), 1, side='buy')
-            elif self.pattern_analyzer.should_sell(volume_data, volume_data.mean() * 1.5):
-                token['decision'] = 'Sell'
-                self.paper_trader.execute_trade(token['token_address'], float(token['price_usd']), 1, side='sell')
-            else:
-                token['decision'] = 'Hold'
-            results.append(token)
+    def get_indicators(self, pair_address: str) -> Optional[Dict[str, float]]:
+        """Streaming RSI/MACD/VWAP/Bollinger/ATR/OBV values for a scanned pair"""
+        return self.indicators.get(pair_address)
+
+    def filter_tokens(self, batch: TokenBatch) -> np.ndarray:
+        """Vectorized analyze_token: boolean mask of rows worth tracking"""
+        # Missing or unparseable values are NaN and fail every comparison
+        mask = ((batch.liquidity_usd > self.min_liquidity_usd)
+                & (batch.volume_24h > self.min_volume_24h)
+                & (batch.price_usd > self.min_price_usd))
+        if self.blacklist:
+            mask &= ~pd.Series(batch.token_address).isin(self.blacklist).to_numpy()
+        return mask
+
+    @staticmethod
+    def pair_liquidity(pair: Optional[Dict]) -> float:
+        if not pair:
+            return -1.0
+        try:
+            return float((pair.get('liquidity') or {}).get('usd') or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def analyze_results(self, tokens: TokenBatch) -> List[Dict]:
+        """Set each token's pattern and decision; returns the paper orders they call for"""
+        # Patterns come from the samples recorded by previous scans
+        with METRICS.timer('pattern_analysis_seconds'):
+            tokens.pattern, tokens.decision = self.pattern_analyzer.evaluate_many(tokens.pair_address.tolist())
+        self.evaluate_alerts(tokens)
+        orders = []
+        for i in np.flatnonzero((tokens.decision == 'Buy') | (tokens.decision == 'Sell')):
+            orders.append({
+                'token_address': tokens.token_address[i], 'side': tokens.decision[i].lower(), 'amount': 1,
+                'price': float(tokens.price_usd[i]), 'liquidity_usd': float(tokens.liquidity_usd[i]),
+                'pair_address': tokens.pair_address[i]
+            })
+        return orders
+
+    def evaluate_alerts(self, tokens: TokenBatch) -> List[Dict]:
+        """Run the alert rules over a scan's analyzed tokens and log what fired"""
+        if not self.alert_engine.rules:
+            return []
+        suppressed = self.alert_engine.suppressed
+        with METRICS.timer('alert_evaluation_seconds'):
+            alerts = self.alert_engine.evaluate(tokens)
+        METRICS.inc('alerts_fired_total', len(alerts))
+        METRICS.inc('alerts_suppressed_total', self.alert_engine.suppressed - suppressed)
+        for alert in alerts:
+            logging.warning(f"Alert {alert['name']}: {alert['token_symbol']} on {alert['chain']} "
+                            f"at ${alert['price_usd']:.8f} ({alert['pair_address']})")
+        return alerts
+
+    def persist_results(self, tokens: TokenBatch, orders: List[Dict]):
+        """Fill a cycle's orders in one batch and store its snapshot"""
+        with METRICS.timer('save_stage_seconds', stage='orders'):
+            self.paper_trader.execute_orders(orders)
+        with METRICS.timer('save_stage_seconds', stage='snapshot_write'):
+            saved = self.snapshot_store.write_batch(tokens)
+        METRICS.inc('orders_total', len(orders))
+        METRICS.inc('snapshot_rows_written_total', saved)
+        logging.info(f"Saved {saved} tokens to {self.snapshot_store.path}")
+
+    def run_service(self, interval: float = 60.0, max_cycles: Optional[int] = None,
+                    stop_event: Optional[threading.Event] = None):
+        """Headless scan/analyze/save/trade loop on a fixed, drift-free schedule.
+
+        Cycle n is due at start + n * interval regardless of how long earlier
+        cycles took. Persistence and trading of one cycle run on a separate
+        worker while the next cycle is already fetching; slots missed because
+        a cycle overran are skipped rather than run back to back.
+        """
+        stop_event = stop_event or threading.Event()
+        persister = ThreadPoolExecutor(max_workers=1, thread_name_prefix='persist')
+        pending = None
+        start = time.monotonic()
+        slot = 0
+        cycles = 0
+        try:
+            while not stop_event.is_set() and (max_cycles is None or cycles < max_cycles):
+                scheduled = start + slot * interval
+                if stop_event.wait(max(0.0, scheduled - time.monotonic())):
+                    break
+                lag = time.monotonic() - scheduled
+                METRICS.observe('cycle_lag_seconds', lag)
+                fetch_start = time.monotonic()
+                tokens = self.scan_new_tokens()
+                orders = self.analyze_results(tokens)
+                fetch_time = time.monotonic() - fetch_start
+                METRICS.observe('cycle_fetch_seconds', fetch_time)
+
+                # The previous cycle's persistence overlapped with this fetch; keep writes in order
+                persist_wait = 0.0
+                if pending is not None:
+                    wait_start = time.monotonic()
+                    pending.result()
+                    persist_wait = time.monotonic() - wait_start
+                pending = persister.submit(self.persist_cycle, cycles, tokens, orders)
+
+                logging.info(f"Cycle {cycles}: lag {lag:.3f}s, fetch+analyze {fetch_time:.2f}s, "
+                             f"waited {persist_wait:.2f}s for previous save, {len(tokens)} tokens, "
+                             f"{len(orders)} orders")
+                cycles += 1
+                slot += 1
+                behind = int((time.monotonic() - start) // interval) - slot
+                if behind > 0:
+                    METRICS.inc('cycles_skipped_total', behind)
+                    logging.warning(f"Cycle {cycles - 1} overran the {interval:.0f}s interval; "
+                                    f"skipping {behind} scheduled cycle(s)")
+                    slot += behind
+        finally:
+            if pending is not None:
+                pending.result()
+            persister.shutdown(wait=True)
 
-        df = pd.DataFrame(results)
-        mode = 'a' if Path(filename).exists() else 'w'
-        df.to_csv(filename, mode=mode, header=(mode == 'w'), index=False)
-        logging.info(f"Saved {len(tokens)} tokens to {filename}")
+    def persist_cycle(self, cycle: int, tokens: TokenBatch, orders: List[Dict]):
+        start = time.monotonic()
+        try:
+            self.persist_results(tokens, orders)
+        except Exception as e:
+            METRICS.inc('cycle_save_errors_total')
+            logging.error(f"Error saving cycle {cycle}: {e}")
+        METRICS.observe('cycle_persist_seconds', time.monotonic() - start)
+        logging.info(f"Cycle {cycle}: persisted in {time.monotonic() - start:.2f}s")
 
     def get_token_info(self, pair: Dict) -> Dict:
         """Extract relevant token information from a pair."""
@@ -462,21 +2954,31 @@ class MemecoinMonitor:
     def analyze_token(self, token_info: Dict) -> bool:
         """Analyze if a token is worth tracking based on criteria."""
         try:
-            if token_info['token_address'] in self.watchlist.get('blacklisted_tokens', []):
+            if token_info['token_address'] in self.blacklist:
                 return False
             if all([
-                token_info['liquidity_usd'] and float(token_info['liquidity_usd']) > 10000,
-                token_info['volume_24h'] and float(token_info['volume_24h']) > 5000,
-                token_info['price_usd'] and float(token_info['price_usd']) > 0.000001
+                token_info['liquidity_usd'] and float(token_info['liquidity_usd']) > self.min_liquidity_usd,
+                token_info['volume_24h'] and float(token_info['volume_24h']) > self.min_volume_24h,
+                token_info['price_usd'] and float(token_info['price_usd']) > self.min_price_usd
             ]):
                 return True
         except Exception as e:
             logging.error(f"Error analyzing token: {e}")
         return False
 
+def build_monitor(args) -> 'MemecoinMonitor':
+    """MemecoinMonitor for a CLI command, served from a recording when --replay is given"""
+    monitor = MemecoinMonitor(cost_basis=args.cost_basis)
+    if args.replay:
+        from memecoin_bench import ReplayAdapter
+        adapter = ReplayAdapter(args.replay, args.replay_latency, args.replay_jitter, args.replay_429_rate,
+                                args.replay_scale)
+        monitor.session.mount('https://', adapter)
+        logging.info(f"Replaying DexScreener responses from {args.replay}")
+    return monitor
 
-def main():
-    monitor = MemecoinMonitor()
+def run_ui_command(args):
+    monitor = build_monitor(args)
     print("\nStarting memecoin monitor and UI... Press Ctrl+C to stop.\n")
 
     # Set up the paper trader UI
@@ -490,8 +2992,230 @@ def main():
     except Exception as e:
         logging.error(f"Error in main loop: {e}")
     finally:
+        monitor.paper_trader.shutdown()
         # Cleanup curses
         curses.endwin()
 
+def run_service_command(args):
+    monitor = build_monitor(args)
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info(f"Received signal {signum}, finishing the current cycle...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    logging.info(f"Starting headless monitor, one cycle every {args.interval:.0f}s")
+    try:
+        monitor.run_service(args.interval, args.cycles, stop_event)
+    finally:
+        monitor.paper_trader.shutdown()
+        logging.info("Headless monitor stopped.")
+
+def scan_once_command(args):
+    monitor = build_monitor(args)
+    tokens = monitor.scan_new_tokens()
+    orders = monitor.analyze_results(tokens)
+    if not args.dry_run:
+        monitor.persist_results(tokens, orders)
+    monitor.paper_trader.shutdown()
+    for token in tokens:
+        print(f"{str(token['token_symbol'])[:10]:<10} {str(token['chain']):<10} ${token['price_usd']:.8f} "
+              f"vol ${token['volume_24h']:,.0f} liq ${token['liquidity_usd']:,.0f} "
+              f"{token['pattern']} -> {token['decision']}")
+    print(f"{len(tokens)} tokens, {len(orders)} orders")
+
+def alerts_command(args):
+    """Validate the alert rules file and list the rules it defines"""
+    rules = load_alert_rules(args.rules)
+    if not rules:
+        print(f"No valid alert rules in {args.rules}")
+        return
+    for rule in rules:
+        print(f"{rule.id:<20} {rule.name[:30]:<30} cooldown {rule.cooldown:g}s  {rule.describe()}")
+    print(f"{len(rules)} rules")
+
+def record_command(args):
+    """Run live scans with every successful DexScreener response appended to a recording"""
+    from memecoin_bench import RecordingAdapter
+    monitor = MemecoinMonitor()
+    adapter = RecordingAdapter(args.output, pool_connections=monitor.max_workers, pool_maxsize=monitor.max_workers)
+    monitor.session.mount('https://', adapter)
+    try:
+        for scan in range(args.scans):
+            if scan:
+                time.sleep(args.interval)
+            monitor.search_cache.entries.clear()
+            tokens = monitor.scan_new_tokens()
+            # Record the bulk token endpoint as well, as used for open positions
+            monitor.fetch_token_pairs([(token['chain'], token['token_address']) for token in tokens], use_cache=False)
+    finally:
+        monitor.paper_trader.shutdown()
+    print(f"Recorded {adapter.recorded} responses to {args.output}")
+
+def bench_command(args):
+    from memecoin_bench import compare_benchmarks, run_benchmarks
+    results = run_benchmarks(sys.modules[__name__], args.recording, args.cycles, args.scale, args.latency, args.jitter, args.rate_429)
+    meta = results['meta']
+    print(f"Replayed {meta['requests']} requests ({meta['throttled']} throttled) from {meta['recording']}, "
+          f"{meta['tracked_pairs']} tracked pairs")
+    regressions = []
+    if args.baseline and Path(args.baseline).exists():
+        with open(args.baseline) as f:
+            regressions = compare_benchmarks(results, json.load(f), args.tolerance)
+    else:
+        for name, metric in results['metrics'].items():
+            print(f"{name:<30} {metric['value']:>14.4f} {metric['unit']}")
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if regressions:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+def bench_patterns_command(args):
+    from memecoin_bench import benchmark_pattern_analyzer
+    benchmark_pattern_analyzer(sys.modules[__name__])
+
+def bench_alerts_command(args):
+    from memecoin_bench import benchmark_alert_engine
+    benchmark_alert_engine(sys.modules[__name__], args.tokens, args.rules, change_rate=args.change_rate)
+
+def clean_command(args):
+    """Remove collected data and paper trading state; the watchlist is kept"""
+    paths = [Path(DATA_FILE), Path(f"{DATA_FILE}-wal"), Path(f"{DATA_FILE}-shm"), Path(LEGACY_DATA_FILE),
+             Path(JOURNAL_FILE), Path(SNAPSHOT_FILE)]
+    paths += sorted(Path('.').glob(f"{JOURNAL_FILE}.*"))
+    removed = 0
+    for path in paths:
+        if path.exists():
+            path.unlink()
+            removed += 1
+            logging.info(f"Removed {path}")
+    print(f"Removed {removed} data file(s)")
+
+def export_command(args):
+    store = SnapshotStore(args.database)
+    since = datetime.fromisoformat(args.since) if args.since else None
+    until = datetime.fromisoformat(args.until) if args.until else None
+    if args.token:
+        frame = store.token_history(args.token, since, until)
+    else:
+        frame = store.range_query(since, until, args.chain)
+    frame.drop(columns=['ts']).to_csv(args.output, index=False)
+    store.close()
+    print(f"Exported {len(frame)} rows to {args.output}")
+
+def backtest_command(args):
+    """Replay recorded snapshots through every combination of buy and sell thresholds"""
+    since = datetime.fromisoformat(args.since) if args.since else None
+    until = datetime.fromisoformat(args.until) if args.until else None
+    if args.csv:
+        engine = BacktestEngine.from_csv(args.csv, chain=args.chain, freq=args.freq, window=args.window)
+    else:
+        store = SnapshotStore(args.database)
+        try:
+            engine = BacktestEngine.from_store(store, since, until, args.chain, freq=args.freq, window=args.window)
+        finally:
+            store.close()
+    if engine.data.empty:
+        print("No snapshots to backtest")
+        return
+    for buy_threshold in args.buy_thresholds:
+        for sell_threshold in args.sell_thresholds:
+            engine.add_strategy(PatternAnalyzer(buy_threshold=buy_threshold, sell_threshold=sell_threshold))
+    results = engine.run_backtest(since, until, fee=args.fee)
+    print(f"{len(engine.data)} observations of {engine.data['pair'].nunique()} pairs in {args.freq} buckets")
+    print(results.sort_values('pnl', ascending=False).to_string(index=False))
+
+def main():
+    parser = argparse.ArgumentParser(description="Memecoin market monitor and paper trader")
+    parser.add_argument('--metrics', action='store_true', help="collect timers, counters and latency histograms")
+    parser.add_argument('--metrics-file', help="write Prometheus text metrics to this file (implies --metrics)")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics "
+                                                         "(implies --metrics)")
+    parser.add_argument('--metrics-interval', type=float, default=15.0, help="seconds between metrics file writes")
+    parser.add_argument('--cost-basis', choices=['average', 'fifo'], default='average',
+                        help="how paper trading sells realize P&L against open lots")
+    replay = parser.add_argument_group('offline replay')
+    replay.add_argument('--replay', help="serve DexScreener responses from this recording instead of the network")
+    replay.add_argument('--replay-latency', type=float, default=0.0, help="seconds added to every replayed request")
+    replay.add_argument('--replay-jitter', type=float, default=0.0, help="+/- seconds of random latency")
+    replay.add_argument('--replay-429-rate', type=float, default=0.0, help="share of requests answered with 429")
+    replay.add_argument('--replay-scale', type=float, default=1.0, help="multiply the pairs in each response")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('ui', help="curses paper trading terminal (default)")
+    run_parser = subparsers.add_parser('run', help="headless monitor: scan, analyze, save and trade on a schedule")
+    run_parser.add_argument('--interval', type=float, default=60.0, help="seconds between cycle starts")
+    run_parser.add_argument('--cycles', type=int, default=None, help="stop after this many cycles")
+    scan_parser = subparsers.add_parser('scan-once', help="run a single scan cycle and print the results")
+    scan_parser.add_argument('--dry-run', action='store_true', help="do not save results or paper trade")
+    subparsers.add_parser('clean', help="delete collected data and paper trading state")
+    export_parser = subparsers.add_parser('export', help="export stored snapshots to CSV")
+    export_parser.add_argument('--output', default='memecoin_export.csv')
+    export_parser.add_argument('--database', default=DATA_FILE)
+    export_parser.add_argument('--token', help="only this token address")
+    export_parser.add_argument('--chain', help="only this chain")
+    export_parser.add_argument('--since', help="ISO timestamp")
+    export_parser.add_argument('--until', help="ISO timestamp")
+    record_parser = subparsers.add_parser('record', help="record live DexScreener responses for offline replay")
+    record_parser.add_argument('--output', default='dexscreener_recording.jsonl')
+    record_parser.add_argument('--scans', type=int, default=1)
+    record_parser.add_argument('--interval', type=float, default=30.0, help="seconds between recorded scans")
+    bench_parser = subparsers.add_parser('bench', help="benchmark scans, cycles, memory and redraws over a replay")
+    bench_parser.add_argument('--recording', help="recording to replay (default: a synthetic one)")
+    bench_parser.add_argument('--cycles', type=int, default=5)
+    bench_parser.add_argument('--scale', type=float, default=1.0, help="multiply the pairs in each response")
+    bench_parser.add_argument('--latency', type=float, default=0.05)
+    bench_parser.add_argument('--jitter', type=float, default=0.02)
+    bench_parser.add_argument('--rate-429', type=float, default=0.0)
+    bench_parser.add_argument('--output', default='bench_results.json')
+    bench_parser.add_argument('--baseline', help="compare against this earlier results file")
+    bench_parser.add_argument('--tolerance', type=float, default=0.15, help="allowed relative slowdown")
+    subparsers.add_parser('bench-patterns', help="benchmark batch vs per-Series pattern analysis")
+    backtest_parser = subparsers.add_parser('backtest', help="replay recorded snapshots to compare signal thresholds")
+    backtest_parser.add_argument('--database', default=DATA_FILE)
+    backtest_parser.add_argument('--csv', help="read snapshots from a CSV export instead of the database")
+    backtest_parser.add_argument('--since', help="ISO timestamp")
+    backtest_parser.add_argument('--until', help="ISO timestamp")
+    backtest_parser.add_argument('--chain', help="only this chain")
+    backtest_parser.add_argument('--freq', default='1min', help="time bucket, e.g. 1min or 15min")
+    backtest_parser.add_argument('--window', type=int, default=64, help="volume samples averaged per signal")
+    backtest_parser.add_argument('--fee', type=float, default=0.003)
+    backtest_parser.add_argument('--buy-thresholds', type=float, nargs='+', default=[1.1],
+                                 help="volume / average volume above which to buy")
+    backtest_parser.add_argument('--sell-thresholds', type=float, nargs='+', default=[0.8],
+                                 help="volume / (1.5 x average volume) below which to sell")
+    alerts_parser = subparsers.add_parser('alerts', help="validate and list the alert rules")
+    alerts_parser.add_argument('--rules', default=ALERT_RULES_FILE)
+    bench_alerts_parser = subparsers.add_parser('bench-alerts', help="benchmark the alert engine vs a rule-by-rule loop")
+    bench_alerts_parser.add_argument('--tokens', type=int, default=5000)
+    bench_alerts_parser.add_argument('--rules', type=int, default=200)
+    bench_alerts_parser.add_argument('--change-rate', type=float, default=0.1, help="share of tokens moving per scan")
+    subparsers.add_parser('help', help="show this help message")
+    args = parser.parse_args()
+
+    commands = {
+        'run': run_service_command,
+        'scan-once': scan_once_command,
+        'clean': clean_command,
+        'export': export_command,
+        'record': record_command,
+        'bench': bench_command,
+        'bench-patterns': bench_patterns_command,
+        'backtest': backtest_command,
+        'alerts': alerts_command,
+        'bench-alerts': bench_alerts_command,
+        'help': lambda args: parser.print_help()
+    }
+    METRICS.enabled = bool(args.metrics or args.metrics_file or args.metrics_port)
+    METRICS.start_exporter(args.metrics_file, args.metrics_port, args.metrics_interval)
+    try:
+        commands.get(args.command, run_ui_command)(args)
+    finally:
+        if METRICS.enabled:
+            METRICS.stop_exporter()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,482 @@
+"""Offline replay of recorded DexScreener traffic and the benchmarks built on it.
+
+Kept out of the memecoin monitor script so the runtime does not carry the
+tooling. The script imports this module for ``--replay``, ``record`` and the
+``bench`` commands and passes itself in as ``app``, since its file name
+cannot be imported.
+"""
+import curses
+import gc
+import http
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+
+def read_json_lines(path: str) -> Iterator[Dict]:
+    """Entries of a JSON-lines recording, stopping at a line torn by an interrupted write"""
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Ignoring truncated entry at the end of {path}")
+                return
+
+
+def pair_liquidity(pair: Optional[Dict]) -> float:
+    if not pair:
+        return -1.0
+    try:
+        return float((pair.get('liquidity') or {}).get('usd') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def fake_color_pair(pair: int) -> int:
+    """Attribute for a color pair without initscr, encoded as curses.color_pair does"""
+    return pair << 8
+
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that also appends every successful DexScreener response to a JSON-lines recording"""
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.lock = threading.Lock()
+        self.recorded = 0
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            line = json.dumps({'url': request.url, 'recorded_at': time.time(), 'body': response.text})
+            with self.lock:
+                with open(self.path, 'a') as f:
+                    f.write(line + '\n')
+                self.recorded += 1
+        return response
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Offline stand-in for api.dexscreener.com serving a RecordingAdapter recording.
+
+    Searches are answered from the recorded response for the same URL (an
+    unknown query that names a recorded token returns that token's pair, any
+    other query an empty result). Token lookups are assembled from every
+    recorded pair. Latency, jitter, the share of requests answered with 429
+    and a payload scale factor that clones pairs under new addresses are
+    configurable; bodies are serialized once so replay cost stays off the
+    measured path.
+    """
+    def __init__(self, path: str, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0,
+                 scale: float = 1.0, seed: Optional[int] = None):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.bodies = {}
+        self.by_token = {}
+        self.queries = []
+        self.served = 0
+        self.throttled = 0
+        self.load(path)
+
+    def load(self, path: str):
+        if not Path(path).exists():
+            raise FileNotFoundError(f"No DexScreener recording at {path}")
+        for entry in read_json_lines(path):
+            url = requests.utils.urlparse(entry['url'])
+            try:
+                data = json.loads(entry['body'])
+            except ValueError:
+                continue
+            if url.path.endswith('/search'):
+                query = requests.utils.unquote(url.query.partition('q=')[2])
+                if query not in self.queries:
+                    self.queries.append(query)
+                pairs = self.scale_pairs(data.get('pairs') or [])
+                self.bodies[query.lower()] = json.dumps({'schemaVersion': '1.0.0', 'pairs': pairs}).encode()
+            else:
+                pairs = self.scale_pairs(data if isinstance(data, list) else data.get('pairs') or [])
+            for pair in pairs:
+                address = ((pair.get('baseToken') or {}).get('address') or '').lower()
+                if address and pair_liquidity(pair) >= pair_liquidity(self.by_token.get(address)):
+                    self.by_token[address] = pair
+        logging.info(f"Loaded {len(self.queries)} recorded searches and {len(self.by_token)} tokens from {path}")
+
+    def scale_pairs(self, pairs: List[Dict]) -> List[Dict]:
+        """Repeat the recorded pairs to len(pairs) * scale, giving each copy fresh addresses"""
+        if not pairs or self.scale == 1.0:
+            return pairs
+        scaled = []
+        for i in range(max(1, round(len(pairs) * self.scale))):
+            pair, copy = pairs[i % len(pairs)], i // len(pairs)
+            if copy:
+                base = dict(pair.get('baseToken') or {})
+                base['address'] = f"{base.get('address')}x{copy}"
+                pair = {**pair, 'pairAddress': f"{pair.get('pairAddress')}x{copy}", 'baseToken': base}
+            scaled.append(pair)
+        return scaled
+
+    def body_for(self, url: str) -> Optional[bytes]:
+        parsed = requests.utils.urlparse(url)
+        if parsed.path.endswith('/search'):
+            query = requests.utils.unquote(parsed.query.partition('q=')[2])
+            body = self.bodies.get(query.lower())
+            if body is None:
+                pair = self.by_token.get(query.lower())
+                body = json.dumps({'schemaVersion': '1.0.0', 'pairs': [pair] if pair else []}).encode()
+            return body
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) >= 3 and parts[0] in ('tokens', 'latest'):
+            addresses = [address.lower() for address in parts[-1].split(',')]
+            pairs = [self.by_token[address] for address in addresses if address in self.by_token]
+            if parts[0] == 'tokens':
+                return json.dumps([pair for pair in pairs if pair.get('chainId') == parts[-2]]).encode()
+            return json.dumps({'schemaVersion': '1.0.0', 'pairs': pairs}).encode()
+        return None
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        with self.lock:
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            throttled = self.rng.random() < self.rate_429
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.Timeout(f"Replay latency {delay:.3f}s exceeded timeout for {request.url}")
+        time.sleep(delay)
+        if throttled:
+            with self.lock:
+                self.throttled += 1
+            return self.build_response(request, 429, b'{"error": "rate limited"}')
+        body = self.body_for(request.url)
+        with self.lock:
+            self.served += 1
+        if body is None:
+            return self.build_response(request, 404, b'{"error": "not recorded"}')
+        return self.build_response(request, 200, body)
+
+    @staticmethod
+    def build_response(request, status: int, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = http.HTTPStatus(status).phrase
+        response._content = body
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def synthesize_recording(path: str, keywords: List[str], pairs_per_keyword: int = 30, seed: int = 7) -> str:
+    """Write a recording of plausible search responses for benchmarking without network access.
+
+    Keywords draw from a shared pool of pairs so results overlap the way real
+    searches do.
+    """
+    rng = random.Random(seed)
+    chains = ['ethereum', 'bsc', 'arbitrum', 'polygon', 'solana', 'base']
+    pool = []
+    for i in range(pairs_per_keyword * len(keywords) * 3 // 4):
+        symbol = f"{rng.choice(keywords).upper()}{i}"
+        pool.append({
+            'chainId': rng.choice(chains), 'dexId': rng.choice(['uniswap', 'pancakeswap', 'raydium', 'sushiswap']),
+            'url': f"https://dexscreener.com/pair/{i}", 'pairAddress': f"0xpair{i:036x}",
+            'baseToken': {'address': f"0xtoken{i:035x}", 'name': f"{symbol} Token", 'symbol': symbol},
+            'quoteToken': {'address': '0xquote', 'name': 'Wrapped Ether', 'symbol': 'WETH'},
+            'priceNative': f"{rng.lognormvariate(-14, 2):.12f}", 'priceUsd': f"{rng.lognormvariate(-10, 3):.12f}",
+            'txns': {'h24': {'buys': rng.randint(0, 5000), 'sells': rng.randint(0, 5000)}},
+            'volume': {'h24': round(rng.lognormvariate(9, 2.5), 2), 'h6': 0, 'h1': 0, 'm5': 0},
+            'priceChange': {'h24': round(rng.uniform(-90, 300), 2), 'h6': 0, 'h1': 0, 'm5': 0},
+            'liquidity': {'usd': round(rng.lognormvariate(9.5, 2), 2), 'base': 0, 'quote': 0},
+            'fdv': rng.randint(10 ** 4, 10 ** 9), 'pairCreatedAt': 1700000000000 + i * 60000
+        })
+    with open(path, 'w') as f:
+        for keyword in keywords:
+            body = json.dumps({'schemaVersion': '1.0.0', 'pairs': rng.sample(pool, min(pairs_per_keyword, len(pool)))})
+            f.write(json.dumps({'url': f"https://api.dexscreener.com/latest/dex/search?q={keyword}",
+                                'recorded_at': time.time(), 'body': body}) + '\n')
+    return path
+
+
+def benchmark_pattern_analyzer(app, n_tokens: int = 10000, n_samples: int = 64, seed: int = 7):
+    """Compare per-Series PatternAnalyzer calls with analyze_batch on ragged random histories"""
+    rng = np.random.default_rng(seed)
+    volumes = rng.lognormal(mean=10, sigma=0.6, size=(n_tokens, n_samples))
+    lengths = rng.integers(1, n_samples + 1, size=n_tokens)
+    mask = np.arange(n_samples) >= n_samples - lengths[:, None]
+    analyzer = app.PatternAnalyzer()
+
+    start = time.perf_counter()
+    expected = []
+    for row, valid in zip(volumes, mask):
+        volume_data = pd.Series(row[valid])
+        if len(volume_data) < analyzer.min_samples:
+            expected.append(("Insufficient Data", False, False))
+            continue
+        buy = analyzer.should_buy(volume_data)
+        sell = not buy and analyzer.should_sell(volume_data, volume_data.mean() * 1.5)
+        expected.append((analyzer.analyze(volume_data), buy, sell))
+    series_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    labels, buy, sell = analyzer.analyze_batch(volumes, mask)
+    batch_time = time.perf_counter() - start
+
+    matches = sum(expected[i] == (labels[i], bool(buy[i]), bool(sell[i])) for i in range(n_tokens))
+    print(f"Tokens: {n_tokens}, samples per token: up to {n_samples}")
+    print(f"Per-Series path: {series_time:.3f}s ({series_time / n_tokens * 1e6:.1f} us/token)")
+    print(f"Batch path:      {batch_time:.3f}s ({batch_time / n_tokens * 1e6:.2f} us/token)")
+    print(f"Speedup: {series_time / batch_time:.0f}x, matching results: {matches}/{n_tokens}")
+
+
+def benchmark_alert_engine(app, n_tokens: int = 5000, n_rules: int = 200, cycles: int = 5,
+                           change_rate: float = 0.1, seed: int = 7):
+    """Compare AlertEngine with checking every rule against every token, over scans where a share of tokens move"""
+    rng = np.random.default_rng(seed)
+    chains = np.array(['ethereum', 'bsc', 'arbitrum', 'polygon', 'solana', 'base'], dtype=object)
+    patterns = np.array(list(app.PatternAnalyzer.PATTERN_LABELS), dtype=object)
+    fields = {'price_change_24h': (-90, 300), 'volume_24h': (0, 10 ** 6), 'liquidity_usd': (0, 10 ** 6),
+              'rsi': (0, 100)}
+    rules = []
+    for i in range(n_rules):
+        picked = rng.choice(list(fields), size=rng.integers(1, 4), replace=False)
+        # Thresholds near the ends of each range, so a rule holds for few tokens as real alert rules do
+        conditions = []
+        for field in picked:
+            low, high = fields[field]
+            op = str(rng.choice(['>', '<']))
+            share = rng.uniform(0.8, 0.99) if op == '>' else rng.uniform(0.01, 0.2)
+            conditions.append([field, op, low + share * (high - low)])
+        if rng.random() < 0.3:
+            conditions.append(['pattern', '==', str(rng.choice(patterns))])
+        rules.append(app.AlertRule(f"rule{i}", conditions, chain=rng.choice(chains) if rng.random() < 0.5 else None,
+                                   cooldown=0))
+    engine = app.AlertEngine(rules, max_per_cycle=n_tokens)
+
+    columns = {field: np.array([f"{field}{i}" for i in range(n_tokens)], dtype=object)
+               for field in app.TokenBatch.STRING_FIELDS}
+    columns['chain'] = rng.choice(chains, size=n_tokens)
+    for field in app.TokenBatch.NUMERIC_FIELDS:
+        columns[field] = rng.uniform(*fields.get(field, (0, 1)), size=n_tokens)
+    columns['rsi'] = rng.uniform(0, 100, size=n_tokens)
+    columns['pattern'] = rng.choice(patterns, size=n_tokens)
+
+    naive_time = engine_time = 0.0
+    mismatches = fired = 0
+    previous = {}
+    for cycle in range(cycles):
+        if cycle:
+            moved = rng.random(n_tokens) < change_rate
+            for field in fields:
+                columns[field] = np.where(moved, rng.uniform(*fields[field], size=n_tokens), columns[field])
+        batch = app.TokenBatch(datetime.now().isoformat(), dict(columns))
+
+        start = time.perf_counter()
+        matching = {}
+        for token in batch:
+            true_rules = {rule.id for rule in rules if rule.matches(token)}
+            if true_rules:
+                matching[token['pair_address']] = true_rules
+        expected = {(key, rule_id) for key, true_rules in matching.items()
+                    for rule_id in true_rules - previous.get(key, set())}
+        previous = matching
+        naive_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        alerts = engine.evaluate(batch, now=float(cycle))
+        engine_time += time.perf_counter() - start
+        mismatches += len(expected ^ {(alert['pair_address'], alert['rule']) for alert in alerts})
+        fired += len(alerts)
+
+    print(f"Tokens: {n_tokens}, rules: {n_rules}, cycles: {cycles}, changed per cycle: {change_rate:.0%}")
+    print(f"Rule-by-rule loop: {naive_time:.3f}s ({naive_time / cycles * 1e3:.1f} ms/cycle)")
+    print(f"Alert engine:      {engine_time:.3f}s ({engine_time / cycles * 1e3:.1f} ms/cycle)")
+    print(f"Speedup: {naive_time / engine_time:.0f}x, alerts: {fired}, mismatches: {mismatches}")
+
+
+class FakeScreen:
+    """Minimal stand-in for a curses window or pad so redraws can be timed without a terminal"""
+    def __init__(self, height: int = 50, width: int = 160):
+        self.height = height
+        self.width = width
+        self.rows = {}
+        self.cursor = (0, 0)
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def clear(self):
+        self.rows = {}
+
+    erase = clear
+
+    def move(self, y: int, x: int):
+        self.cursor = (y, x)
+
+    def clrtoeol(self):
+        self.rows.pop(self.cursor[0], None)
+
+    def addstr(self, y: int, x: int, text: str, attr: int = 0):
+        if not (0 <= y < self.height and 0 <= x + len(text) <= self.width):
+            raise curses.error("addstr() returned ERR")
+        self.rows[y] = text
+
+    def touchline(self, y: int, count: int):
+        pass
+
+    def noutrefresh(self, *viewport):
+        pass
+
+    def refresh(self):
+        pass
+
+
+def benchmark_monitor(app, workdir: str, adapter: ReplayAdapter):
+    """A monitor with its data files under workdir, talking to the replay adapter without rate limiting"""
+    monitor = app.MemecoinMonitor(watchlist_file=os.path.join(workdir, 'watchlist.json'),
+                                  requests_per_minute=10 ** 9, cache_ttl=0,
+                                  data_file=os.path.join(workdir, 'bench.db'),
+                                  legacy_csv=os.path.join(workdir, 'missing.csv'),
+                                  journal_file=os.path.join(workdir, 'bench.journal'),
+                                  snapshot_file=os.path.join(workdir, 'bench.snapshot.json'),
+                                  color_pair=fake_color_pair)
+    monitor.session.mount('https://', adapter)
+    monitor.watchlist['keywords'] = adapter.queries
+    return monitor
+
+
+def close_monitor(monitor):
+    monitor.paper_trader.shutdown()
+    monitor.snapshot_store.close()
+    monitor.executor.shutdown(wait=True)
+
+
+def run_benchmarks(app, recording: Optional[str] = None, cycles: int = 5, scale: float = 1.0, latency: float = 0.05,
+                   jitter: float = 0.02, rate_429: float = 0.0, redraws: int = 200, seed: int = 7) -> Dict:
+    """Scan throughput, cycle time, memory per tracked token and UI redraw latency over a replayed API"""
+    metrics = {}
+
+    def record(name: str, value: float, unit: str, better: str = 'lower'):
+        metrics[name] = {'value': round(float(value), 6), 'unit': unit, 'better': better}
+
+    logging.disable(logging.WARNING)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            source = recording or 'synthetic'
+            if recording is None:
+                keywords = app.MemecoinMonitor.default_watchlist()['keywords']
+                recording = synthesize_recording(os.path.join(workdir, 'synthetic.jsonl'),
+                                                 list(dict.fromkeys(keywords)), seed=seed)
+
+            # Throughput and end-to-end cycles against a replay with realistic latency
+            adapter = ReplayAdapter(recording, latency, jitter, rate_429, scale, seed)
+            monitor = benchmark_monitor(app, workdir, adapter)
+            scan_times, cycle_times, pairs = [], [], 0
+            for _ in range(cycles):
+                start = time.perf_counter()
+                tokens = monitor.scan_new_tokens()
+                scanned = time.perf_counter()
+                monitor.persist_results(tokens, monitor.analyze_results(tokens))
+                scan_times.append(scanned - start)
+                cycle_times.append(time.perf_counter() - start)
+                pairs += monitor.last_scan_pairs
+            record('scan_seconds_p50', np.percentile(scan_times, 50), 's')
+            record('scan_pairs_per_second', pairs / sum(scan_times), 'pairs/s', 'higher')
+            record('cycle_seconds_p50', np.percentile(cycle_times, 50), 's')
+            record('cycle_seconds_p95', np.percentile(cycle_times, 95), 's')
+            requests_served, throttled = adapter.served, adapter.throttled
+
+            # UI frames over the last scan's tokens and a few hundred paper trades, scrolling
+            # the list pages by one row per frame
+            trader = monitor.paper_trader
+            trader.set_monitor(monitor)
+            trader.poller.publish(tokens, {})
+            trader.execute_orders([{'token_address': token['token_address'], 'side': 'buy', 'amount': 1,
+                                    'price': token['price_usd'], 'liquidity_usd': token['liquidity_usd'],
+                                    'pair_address': token['pair_address']} for token in tokens[:500]])
+            renderer = app.Renderer(FakeScreen(), new_pad=FakeScreen, doupdate=lambda: None)
+            for page in ('scanner', 'history', 'portfolio'):
+                trader.current_page = page
+                redraw_times = []
+                for _ in range(redraws):
+                    trader.handle_input(curses.KEY_DOWN)
+                    start = time.perf_counter()
+                    renderer.render(trader.draw)
+                    redraw_times.append(time.perf_counter() - start)
+                record(f'ui_{page}_redraw_ms_p50', np.percentile(redraw_times, 50) * 1000, 'ms')
+                record(f'ui_{page}_redraw_ms_p95', np.percentile(redraw_times, 95) * 1000, 'ms')
+            close_monitor(monitor)
+
+            # Memory retained per tracked pair, measured on a fresh monitor with no latency
+            adapter = ReplayAdapter(recording, scale=scale, seed=seed)
+            workdir_memory = os.path.join(workdir, 'memory')
+            os.makedirs(workdir_memory)
+            monitor = benchmark_monitor(app, workdir_memory, adapter)
+            gc.collect()
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            for _ in range(cycles):
+                tokens = monitor.scan_new_tokens()
+                monitor.analyze_results(tokens)
+            del tokens
+            gc.collect()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            tracked = max(1, len(monitor.history))
+            record('memory_bytes_per_token', (current - baseline) / tracked, 'bytes')
+            record('peak_memory_bytes_per_token', (peak - baseline) / tracked, 'bytes')
+            close_monitor(monitor)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        'meta': {
+            'recorded_at': datetime.now().isoformat(timespec='seconds'), 'python': sys.version.split()[0],
+            'recording': source, 'cycles': cycles, 'scale': scale, 'latency': latency, 'jitter': jitter,
+            'rate_429': rate_429, 'requests': requests_served, 'throttled': throttled, 'tracked_pairs': tracked
+        },
+        'metrics': metrics
+    }
+
+
+def compare_benchmarks(results: Dict, baseline: Dict, tolerance: float = 0.15) -> List[str]:
+    """Print current results against a baseline; returns the metrics that regressed beyond tolerance"""
+    settings = ('recording', 'cycles', 'scale', 'latency', 'jitter', 'rate_429')
+    changed = [key for key in settings if results['meta'].get(key) != baseline['meta'].get(key)]
+    if changed:
+        print(f"Warning: baseline was recorded with different settings ({', '.join(changed)})")
+    regressions = []
+    print(f"{'Metric':<30} {'Baseline':>14} {'Current':>14} {'Change':>9}")
+    for name, current in results['metrics'].items():
+        previous = baseline['metrics'].get(name)
+        if not previous or not previous['value']:
+            print(f"{name:<30} {'--':>14} {current['value']:>14.4f}")
+            continue
+        change = current['value'] / previous['value'] - 1
+        worse = change > tolerance if current['better'] == 'lower' else change < -tolerance
+        if worse:
+            regressions.append(name)
+        print(f"{name:<30} {previous['value']:>14.4f} {current['value']:>14.4f} {change:>+8.1%}"
+              f"{'  REGRESSION' if worse else ''}")
+    return regressions
@@ -0,0 +1,22 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / '3lon.py'
+
+
+@pytest.fixture(scope='session')
+def monitor(tmp_path_factory):
+    """The 3lon.py module, loaded by path since its name cannot be imported"""
+    # The module opens memecoin_monitor.log in the working directory when it is loaded
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('logs'))
+    try:
+        spec = importlib.util.spec_from_file_location('memecoin_monitor', SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+    return module
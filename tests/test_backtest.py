@@ -0,0 +1,97 @@
+import subprocess
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SCRIPT
+
+
+def random_snapshots(rng, pairs=12, minutes=240):
+    """Scans every ~20s for pairs that come and go, with missing volumes and bad prices"""
+    rows = []
+    start = pd.Timestamp('2024-01-01')
+    for pair in range(pairs):
+        price = rng.lognormal(-8, 1)
+        first, last = sorted(rng.integers(0, minutes, 2))
+        for second in range(first * 60, (last + 1) * 60, 20):
+            if rng.random() < 0.3:
+                continue
+            price *= np.exp(rng.normal(0, 0.03))
+            volume = rng.lognormal(10, 0.8)
+            rows.append({
+                'timestamp': (start + pd.Timedelta(seconds=int(second))).isoformat(),
+                'pair_address': f"0xpair{pair}",
+                'price_usd': price if rng.random() > 0.02 else 0.0,
+                'volume_24h': volume if rng.random() > 0.05 else np.nan,
+                'chain': 'ethereum' if pair % 2 else 'bsc'
+            })
+    return pd.DataFrame(rows)
+
+
+def naive_backtest(data, strategy, freq, window, fee=0.003, trade_size=1.0, initial_capital=10000.0):
+    """One observation at a time: last valid sample per pair and bucket, one unit per signal"""
+    frame = data.assign(timestamp=pd.to_datetime(data['timestamp']))
+    frame = frame[frame['price_usd'].notna() & frame['volume_24h'].notna() & (frame['price_usd'] > 0)]
+    frame = frame.assign(bucket=frame['timestamp'].dt.floor(freq))
+    frame = frame.sort_values('timestamp', kind='stable').groupby(['bucket', 'pair_address']).last().reset_index()
+
+    volumes, positions, last_price = {}, {}, {}
+    cash, trades, fees, equity = 0.0, 0, 0.0, []
+    for bucket, observations in frame.groupby('bucket', sort=True):
+        for row in observations.itertuples():
+            history = volumes.setdefault(row.pair_address, deque(maxlen=window))
+            history.append(row.volume_24h)
+            average = sum(history) / len(history)
+            order = 0
+            if len(history) >= max(strategy.min_samples, 1):
+                if row.volume_24h > strategy.buy_threshold * average:
+                    order = 1
+                elif row.volume_24h < strategy.sell_threshold * average * 1.5:
+                    order = -1
+            position = positions.get(row.pair_address, 0.0)
+            new_position = max(0.0, position + order * trade_size)
+            executed = new_position - position
+            if executed:
+                trades += 1
+                cash -= executed * row.price_usd
+                fees += abs(executed * row.price_usd) * fee
+                cash -= abs(executed * row.price_usd) * fee
+            positions[row.pair_address] = new_position
+            last_price[row.pair_address] = row.price_usd
+        holdings = sum(position * last_price[pair] for pair, position in positions.items())
+        equity.append(initial_capital + cash + holdings)
+    return trades, fees, np.array(equity)
+
+
+@pytest.mark.parametrize('freq, window', [('1min', 64), ('5min', 8)])
+def test_backtest_matches_naive_event_loop(monitor, freq, window):
+    data = random_snapshots(np.random.default_rng(3))
+    engine = monitor.BacktestEngine(data, freq=freq, window=window)
+    strategies = [monitor.PatternAnalyzer(buy_threshold=buy, sell_threshold=sell)
+                  for buy, sell in [(1.1, 0.8), (1.5, 0.5), (0.9, 1.0)]]
+    for strategy in strategies:
+        engine.add_strategy(strategy)
+    results = engine.run_backtest()
+
+    for strategy, metrics, curve in zip(strategies, results.to_dict('records'), engine.equity_curves):
+        trades, fees, equity = naive_backtest(data, strategy, freq, window)
+        assert metrics['trades'] == trades
+        np.testing.assert_allclose(metrics['fees'], fees, rtol=1e-9)
+        np.testing.assert_allclose(curve.to_numpy(), equity, rtol=1e-9)
+
+
+def test_backtest_command_compares_threshold_grid(tmp_path):
+    data = random_snapshots(np.random.default_rng(5))
+    data.to_csv(tmp_path / 'snapshots.csv', index=False)
+    output = subprocess.run(
+        [sys.executable, str(SCRIPT), 'backtest', '--csv', 'snapshots.csv', '--chain', 'bsc', '--freq', '5min',
+         '--buy-thresholds', '1.1', '1.3', '--sell-thresholds', '0.5', '0.8', '0.9'],
+        cwd=tmp_path, capture_output=True, text=True, check=True).stdout
+
+    lines = output.strip().splitlines()
+    assert 'pairs in 5min buckets' in lines[0]
+    assert lines[1].split()[:3] == ['buy_threshold', 'sell_threshold', 'trades']
+    assert len(lines) == 2 + 2 * 3
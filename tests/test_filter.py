@@ -0,0 +1,34 @@
+import itertools
+
+import pytest
+
+
+@pytest.fixture
+def scanner(monitor, tmp_path):
+    scanner = monitor.MemecoinMonitor(watchlist_file=str(tmp_path / 'watchlist.json'),
+                                      data_file=str(tmp_path / 'data.db'), legacy_csv=str(tmp_path / 'missing.csv'),
+                                      journal_file=str(tmp_path / 'trades.journal'),
+                                      snapshot_file=str(tmp_path / 'trades.snapshot.json'),
+                                      rules_file=str(tmp_path / 'rules.json'))
+    yield scanner
+    scanner.paper_trader.shutdown()
+    scanner.snapshot_store.close()
+    scanner.executor.shutdown()
+
+
+def test_filter_tokens_accepts_what_analyze_token_accepts(monitor, scanner):
+    values = [None, 0, '0', '', 'n/a', '1,000', 'nan', ' 20000 ', '0.0000005', '0.5', 5e-7, 0.5, 4999, '5001',
+              20000, '1e6', 1e6]
+    scanner.blacklist = {'0xbanned'}
+    pairs = []
+    for i, (liquidity, volume, price) in enumerate(itertools.product(values, repeat=3)):
+        pairs.append({
+            'baseToken': {'address': '0xbanned' if i % 7 == 0 else f"0xtoken{i}", 'name': 'Token', 'symbol': 'TKN'},
+            'chainId': 'ethereum', 'dexId': 'uniswap', 'pairAddress': f"0xpair{i}", 'priceUsd': price,
+            'priceChange': {'h24': 1.0}, 'volume': {'h24': volume}, 'liquidity': {'usd': liquidity}
+        })
+
+    expected = [scanner.analyze_token(scanner.get_token_info(pair)) for pair in pairs]
+    mask = scanner.filter_tokens(monitor.TokenBatch.from_pairs(pairs))
+    assert sum(expected) > 0
+    assert mask.tolist() == expected
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def reference_indicators(prices, volumes, indicators):
+    """Full-history pandas computation of the values StreamingIndicators maintains incrementally"""
+    price = pd.Series(prices, dtype=float)
+    volume = pd.Series(volumes, dtype=float).fillna(0.0)
+    change = price.diff().iloc[1:]
+    result = {}
+    if len(change):
+        avg_gain = change.clip(lower=0).ewm(alpha=1 / indicators.rsi_period, adjust=False).mean().iloc[-1]
+        avg_loss = (-change).clip(lower=0).ewm(alpha=1 / indicators.rsi_period, adjust=False).mean().iloc[-1]
+        if avg_loss == 0:
+            result['rsi'] = 100.0 if avg_gain > 0 else 50.0
+        else:
+            result['rsi'] = 100 - 100 / (1 + avg_gain / avg_loss)
+        result['atr'] = change.abs().ewm(alpha=1 / indicators.atr_period, adjust=False).mean().iloc[-1]
+    else:
+        result['rsi'] = result['atr'] = np.nan
+    macd = (price.ewm(span=indicators.macd_fast, adjust=False).mean()
+            - price.ewm(span=indicators.macd_slow, adjust=False).mean())
+    signal = macd.ewm(span=indicators.macd_signal, adjust=False).mean()
+    result['macd'] = macd.iloc[-1]
+    result['macd_signal'] = signal.iloc[-1]
+    result['macd_hist'] = macd.iloc[-1] - signal.iloc[-1]
+    result['vwap'] = (price * volume).sum() / volume.sum() if volume.sum() else np.nan
+    window = price.iloc[-indicators.bollinger_period:]
+    std = window.std(ddof=0)
+    result['bollinger_mid'] = window.mean()
+    result['bollinger_upper'] = window.mean() + indicators.bollinger_width * std
+    result['bollinger_lower'] = window.mean() - indicators.bollinger_width * std
+    result['obv'] = (np.sign(price.diff().fillna(0)) * volume).sum()
+    return result
+
+
+def random_ticks(rng, count):
+    """A lognormal price walk with occasional flat ticks and missing volumes"""
+    prices = 1e-4 * np.exp(np.cumsum(rng.normal(0, 0.05, count)))
+    prices[rng.random(count) < 0.1] = np.nan
+    prices = pd.Series(prices).ffill().fillna(1e-4).to_numpy()
+    volumes = rng.lognormal(10, 1, count)
+    volumes[rng.random(count) < 0.2] = np.nan
+    return prices, volumes
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 14, 20, 21, 64, 500])
+def test_streaming_indicators_match_full_history(monitor, count):
+    rng = np.random.default_rng(count)
+    prices, volumes = random_ticks(rng, count)
+    indicators = monitor.StreamingIndicators()
+    for price, volume in zip(prices, volumes):
+        indicators.update('pair', float(price), float(volume))
+
+    streamed = indicators.get('pair')
+    expected = reference_indicators(prices, volumes, indicators)
+    for name, value in expected.items():
+        np.testing.assert_allclose(streamed[name], value, rtol=1e-9, atol=1e-12, err_msg=name)
+
+
+def test_update_many_and_rsi_many_match_per_token_updates(monitor):
+    rng = np.random.default_rng(7)
+    keys = [f"pair{i}" for i in range(20)]
+    batched, single = monitor.StreamingIndicators(), monitor.StreamingIndicators()
+    for _ in range(40):
+        prices, volumes = random_ticks(rng, len(keys))
+        batched.update_many(keys, prices, volumes)
+        for key, price, volume in zip(keys, prices, volumes):
+            single.update(key, float(price), float(volume))
+
+    expected = [single.get(key)['rsi'] for key in keys] + [np.nan]
+    np.testing.assert_allclose(batched.rsi_many(keys + ['untracked']), expected, rtol=1e-12)
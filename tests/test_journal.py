@@ -0,0 +1,28 @@
+def buy(trader, token, amount, price=1.0):
+    return trader.execute_orders([{'token_address': token, 'side': 'buy', 'amount': amount, 'price': price}])
+
+
+def test_fill_after_torn_line_survives_restart(monitor, tmp_path):
+    def open_trader():
+        journal = monitor.TradeJournal(str(tmp_path / 'trades.journal'), str(tmp_path / 'trades.snapshot.json'))
+        return monitor.PaperTraderUI(journal=journal)
+
+    trader = open_trader()
+    buy(trader, 'A', 2)
+    buy(trader, 'A', 3)
+    # Crash: no shutdown snapshot, and the last write was cut short
+    trader.journal.close()
+    with open(tmp_path / 'trades.journal', 'a') as f:
+        f.write('{"seq": 3, "capi')
+
+    trader = open_trader()
+    assert trader.positions == {'A': 5.0}
+    buy(trader, 'B', 5)
+    capital = trader.capital
+    trader.journal.close()
+
+    trader = open_trader()
+    assert trader.positions == {'A': 5.0, 'B': 5.0}
+    assert trader.capital == capital
+    assert [entry['seq'] for entry in trader.journal.replay_all()] == [1, 2, 3]
+    trader.shutdown()